@@ -0,0 +1,42 @@
+// Virtualized tables (see screens/places.py). A scroll container marked with
+// data-viewport reports the window of rows it needs to that dcc.Store, which
+// has the server send just those rows. Windows start on a step boundary one
+// step above the first visible row, so scrolling within a window sends nothing.
+// places.py registers virtual_scroll.reset on the store.
+(function () {
+    var pending = false;
+
+    document.addEventListener("scroll", function (event) {
+        var box = event.target;
+        if (pending || !box.dataset || !box.dataset.viewport) {
+            return;
+        }
+        pending = true;
+        window.requestAnimationFrame(function () {
+            pending = false;
+            var rowHeight = Number(box.dataset.rowHeight);
+            var step = Math.max(1, Math.floor(Number(box.dataset.windowRows) / 3));
+            var first = Math.floor(box.scrollTop / rowHeight);
+            var start = Math.max(0, Math.floor(first / step) * step - step);
+            if (String(start) !== box.dataset.start && window.dash_clientside.set_props) {
+                box.dataset.start = start;
+                window.dash_clientside.set_props(box.dataset.viewport, {data: {start: start}});
+            }
+        });
+    }, true);  // scroll events do not bubble
+
+    // A store set back to the first window by the server (a new filter or
+    // sort) scrolls its box back to the top, and forgets the last window
+    // sent so scrolling to it again is reported
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        virtual_scroll: {
+            reset: function (viewport, storeId) {
+                var box = document.querySelector('[data-viewport="' + storeId + '"]');
+                if (box && viewport && viewport.start === 0 && box.dataset.start !== "0") {
+                    box.scrollTop = 0;
+                    delete box.dataset.start;
+                }
+            }
+        }
+    });
+})();
@@ -0,0 +1,286 @@
+"""Route-finding benchmarks on synthetic campus graphs.
+
+    python bench_routes.py                               # 10k, 100k and 1M edges
+    python bench_routes.py --sizes 10000 --queries 500 --output before.json
+    python bench_routes.py --sizes 10000 --compare before.json
+
+Each run writes a routes.csv-shaped file per size to a temporary folder
+and measures CSV load, graph index build, query latency percentiles and
+memory through the same functions the route finder uses.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Add the current directory to the path so we can import the screens package
+sys.path.insert(0, os.path.dirname(__file__))
+
+from screens import repository, route_finder
+from screens.route_graph import RouteGraph
+from screens.distance_table import DistanceTable, MAX_TABLE_LOCATIONS
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+
+# ---------------- Synthetic Graphs ----------------
+def synthetic_routes(edges, locations=None, parallel_ratio=0.2, accessible_ratio=0.6, seed=0,
+                     per_building=50, floors=6, local_ratio=0.8):
+    """routes.csv- and locations.csv-shaped frames for a synthetic campus.
+
+    Locations are grouped into buildings of per_building rooms over floors;
+    a random spanning tree keeps everything reachable, local_ratio of the
+    remaining routes stay inside one building, and route distances grow
+    with the floors climbed and with building changes.
+    """
+    rng = np.random.default_rng(seed)
+    locations = locations or max(10, edges // 10)
+    names = np.array([f"Location {i}" for i in range(locations)], dtype=object)
+    building = np.arange(locations) // per_building
+    floor = rng.integers(0, floors, locations)
+
+    # Random spanning tree keeps every location reachable
+    tree_end = np.arange(1, locations)
+    tree_start = (rng.random(locations - 1) * tree_end).astype(np.int64)
+
+    n_parallel = int((edges - len(tree_end)) * parallel_ratio) if edges > len(tree_end) else 0
+    n_random = max(0, edges - len(tree_end) - n_parallel)
+    random_start = rng.integers(0, locations, n_random)
+    random_end = (random_start + rng.integers(1, locations, n_random)) % locations
+    local = rng.random(n_random) < local_ratio
+    same_building = np.minimum(
+        building[random_start] * per_building + rng.integers(0, per_building, n_random), locations - 1
+    )
+    random_end = np.where(local, same_building, random_end)
+
+    start = np.concatenate([tree_start, random_start])
+    end = np.concatenate([tree_end, random_end])
+
+    # Parallel routes repeat an existing pair with a different distance / accessibility
+    pick = rng.integers(0, len(start), n_parallel)
+    start = np.concatenate([start, start[pick]])[:edges]
+    end = np.concatenate([end, end[pick]])[:edges]
+
+    n = len(start)
+    distance = (
+        rng.integers(5, 60, n)
+        + 25 * np.abs(floor[start] - floor[end])
+        + 150 * (building[start] != building[end])
+    )
+    routes = pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "start_location": names[start],
+        "end_location": names[end],
+        "distance_m": distance,
+        "accessible": rng.random(n) < accessible_ratio,
+    })
+    places = pd.DataFrame({
+        "id": np.arange(1, locations + 1),
+        "name": names,
+        "building": [f"Building {b}" for b in building],
+        "floor": floor,
+        "accessible": rng.random(locations) < accessible_ratio,
+    })
+    return routes, places
+
+
+# ---------------- Measurements ----------------
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def percentiles(samples_s):
+    ms = np.array(samples_s) * 1000.0
+    if not len(ms):
+        return {}
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+def query_latencies(fn, pairs):
+    samples = []
+    for start, end in pairs:
+        _, elapsed = timed(fn, start, end)
+        samples.append(elapsed)
+    return percentiles(samples)
+
+
+def traced_peak_mb(fn, *args):
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current / 2**20, peak / 2**20
+
+
+def bench_size(edges, args, workdir):
+    df, places = synthetic_routes(
+        edges, args.locations, args.parallel_ratio, args.accessible_ratio, args.seed, args.per_building
+    )
+    path = os.path.join(workdir, f"routes_{edges}.csv")
+    df.to_csv(path, index=False)
+
+    table = repository.routes.at(path)
+    routes, load_s = timed(table.read)
+    _, snapshot_load_s = timed(table.read)
+    graph, build_s = timed(RouteGraph, routes)
+    _, attach_s = timed(graph.attach_locations, places)
+
+    rng = random.Random(args.seed)
+    pairs = [tuple(rng.sample(graph.locations, 2)) for _ in range(args.queries)]
+    k_pairs = pairs[:max(1, args.queries // 10)]
+
+    # "Same building, different floor" queries, the common case A* targets
+    meta = places.set_index("name")
+    by_building = {b: list(group) for b, group in meta.groupby("building").groups.items()}
+    building_pairs = []
+    while len(building_pairs) < args.queries:
+        rooms = by_building[rng.choice(list(by_building))]
+        start, end = rng.sample(rooms, 2) if len(rooms) > 1 else (rooms[0], rooms[0])
+        if meta.at[start, "floor"] != meta.at[end, "floor"]:
+            building_pairs.append((start, end))
+
+    result = {
+        "edges": int(len(routes)),
+        "locations": len(graph.locations),
+        "csv_mb": os.path.getsize(path) / 2**20,
+        "load_s": load_s,
+        "snapshot_load_s": snapshot_load_s,
+        "build_s": build_s,
+        "attach_locations_s": attach_s,
+        "dijkstra": query_latencies(graph.shortest_path, pairs),
+        "dijkstra_accessible": query_latencies(
+            lambda s, e: graph.shortest_path(s, e, accessible_only=True), pairs
+        ),
+        "k_shortest_3": query_latencies(
+            lambda s, e: graph.k_shortest_paths(s, e, 3, time_budget=route_finder.ALTERNATIVES_TIME_BUDGET),
+            k_pairs
+        ),
+        "same_building_dijkstra": query_latencies(graph.shortest_path, building_pairs),
+        "same_building_astar": query_latencies(
+            lambda s, e: graph.shortest_path(s, e, astar=True), building_pairs
+        ),
+        "same_building_explored": {
+            "dijkstra_mean": float(np.mean([graph.explored(s, e) for s, e in building_pairs])),
+            "astar_mean": float(np.mean([graph.explored(s, e, astar=True) for s, e in building_pairs])),
+        },
+        "frame_mb": float(routes.memory_usage(deep=True).sum()) / 2**20,
+    }
+
+    try:
+        _, sparse_s = timed(graph.sparse_matrix)
+        result["sparse_build_s"] = sparse_s
+    except ImportError:
+        pass
+
+    if len(graph.locations) <= min(args.table_locations, MAX_TABLE_LOCATIONS):
+        table, table_s = timed(DistanceTable, graph)
+        result["table_build_s"] = table_s
+        result["table_lookup"] = query_latencies(table.path, pairs)
+
+    blob, save_s = timed(graph.to_bytes)
+    _, blob_load_s = timed(RouteGraph.from_bytes, blob)
+    result["blob_mb"] = len(blob) / 2**20
+    result["blob_save_s"] = save_s
+    result["blob_load_s"] = blob_load_s
+
+    store = os.path.join(workdir, f"routes_{edges}.graph")
+    _, store_save_s = timed(graph.save, store)
+    _, store_map_s = timed(RouteGraph.load, store)
+    result["store_save_s"] = store_save_s
+    result["store_map_s"] = store_map_s
+
+    _, graph_mb, build_peak_mb = traced_peak_mb(RouteGraph, routes)
+    result["graph_mb"] = graph_mb
+    result["build_peak_mb"] = build_peak_mb
+
+    for leftover in (path, repository.snapshot_path(path), store):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    return result
+
+
+# ---------------- Report ----------------
+def flatten(result, prefix=""):
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def print_result(result, previous=None):
+    print(f"--- {result['edges']} edges, {result['locations']} locations ---")
+    before = flatten(previous) if previous else {}
+    for key, value in flatten(result).items():
+        line = f"  {key:32} {value:14.4f}"
+        if key in before and before[key]:
+            change = (value - before[key]) / before[key] * 100
+            line += f"   was {before[key]:14.4f}  ({change:+.1f}%)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="edge counts to benchmark")
+    parser.add_argument("--locations", type=int, default=None, help="locations per graph (default: edges / 10)")
+    parser.add_argument("--parallel-ratio", type=float, default=0.2, help="share of routes duplicating an existing pair")
+    parser.add_argument("--per-building", type=int, default=50, help="locations per synthetic building")
+    parser.add_argument("--accessible-ratio", type=float, default=0.6, help="share of accessible routes")
+    parser.add_argument("--queries", type=int, default=200, help="random queries per size")
+    parser.add_argument("--table-locations", type=int, default=1000,
+                        help="build the all-pairs table only up to this many locations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = {r["edges"]: r for r in json.load(f)["results"]}
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for edges in args.sizes:
+            result = bench_size(edges, args, workdir)
+            print_result(result, previous.get(result["edges"]))
+            results.append(result)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
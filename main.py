@@ -2,9 +2,9 @@ import dash
 import dash_bootstrap_components as dbc
 from dash import html, dcc
 from dash.dependencies import Input, Output, State
-import csv
 import json
 
+from screens import repository
 from screens.auth import login_layout
 from screens.home import dashboard_layout
 from screens.user_manager import users_tab_layout, register_users_callbacks
@@ -13,6 +13,8 @@ from screens.alerts import notifications_layout, register_notifications_callback
 from screens.route_manager import routes_layout, register_routes_callbacks
 from screens.route_finder import layout as find_routes_layout, register_find_routes_callbacks
 from screens.reports import reports_layout, register_reports_callbacks
+from screens.distance_api import register_distance_api
+from screens.bulk_io import register_bulk_api
 
 # ---------------- App ----------------
 app = dash.Dash(
@@ -25,27 +27,29 @@ app = dash.Dash(
 )
 app.title = "Dashboard App"
 
+# How often clients re-check the data versions (see refresh_data_versions)
+DATA_VERSIONS_POLL_MS = 5000
+
 # ---------------- Layout ----------------
 app.layout = html.Div([
     dcc.Location(id="url", refresh=False),
     dcc.Store(id="session-user", storage_type="session"),
+    dcc.Store(id="data-versions"),
+    dcc.Interval(id="data-versions-poll", interval=DATA_VERSIONS_POLL_MS),
     html.Div(id="page-content")
 ])
 
-# ================== READ USERS ==================
-def read_users():
-    try:
-        with open("data/users.csv", "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            return list(reader)
-    except FileNotFoundError:
-        return [
-            {"username": "admin", "password": "1234", "role": "admin"},
-            {"username": "user1", "password": "abcd", "role": "user"},
-        ]
-    except Exception as e:
-        print(f"Error reading users: {e}")
-        return []
+# ================== DATA VERSIONS ==================
+# Screens re-render their tables from the "data-versions" store, and skip
+# the work when the version of their table has not changed
+@app.callback(
+    Output("data-versions", "data"),
+    Input("data-versions-poll", "n_intervals"),
+    State("data-versions", "data"),
+)
+def refresh_data_versions(_, current):
+    versions = repository.data_versions()
+    return dash.no_update if versions == current else versions
 
 # ================== ROUTER ==================
 @app.callback(
@@ -114,11 +118,10 @@ def handle_login(n_clicks, username, password):
     if not username or not password:
         return dash.no_update, dash.no_update, "Please enter username and password", {"display": "block", "color": "red"}
     
-    users = read_users()
-    for user in users:
-        if user["username"] == username and user["password"] == password:
-            user_data = {"username": username, "role": user.get("role", "user")}
-            return json.dumps(user_data), "/dashboard", "Login successful!", {"display": "block", "color": "green"}
+    user = repository.users.find("username", username)
+    if user and user["password"] == password:
+        user_data = {"username": username, "role": user.get("role", "user")}
+        return json.dumps(user_data), "/dashboard", "Login successful!", {"display": "block", "color": "green"}
     
     return dash.no_update, dash.no_update, "Invalid username or password", {"display": "block", "color": "red"}
 
@@ -228,6 +231,10 @@ register_find_routes_callbacks(app)
 register_notifications_callbacks(app)
 register_reports_callbacks(app)
 
+# ================== REGISTER API ROUTES ==================
+register_distance_api(app)
+register_bulk_api(app)
+
 # ================== RUN APP ==================
 if __name__ == "__main__":
     app.run(debug=True)
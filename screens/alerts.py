@@ -1,26 +1,17 @@
-import os
 import dash
-import pandas as pd
 import json
-from dash import html, dcc, Input, Output, State
+from dash import html, dcc, Input, Output, State, Patch
 from dash.dependencies import ALL
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 
+from screens import repository
+from screens.render_cache import RenderCache
+
 # ------------------ Config ------------------
-NOTIF_CSV_PATH = "data/notification.csv"
 BLUE = "#2f80ed"
 
-# ------------------ CSV Read / Write ------------------
-def read_notifications():
-    if os.path.exists(NOTIF_CSV_PATH):
-        df = pd.read_csv(NOTIF_CSV_PATH)
-        df["delivered"] = df["delivered"].apply(lambda x: True if str(x).lower() == "true" else False)
-        return df
-    return pd.DataFrame(columns=["id", "user_id", "message", "delivered"])
-
-def save_notifications(df):
-    df.to_csv(NOTIF_CSV_PATH, index=False)
+_render_cache = RenderCache()
 
 # ------------------ Table ------------------
 def generate_notifications_table(df, user_role="student"):
@@ -32,43 +23,61 @@ def generate_notifications_table(df, user_role="student"):
         html.Th("Actions", className="p-2 bg-light border"),
     ])
 
-    rows = []
-    is_disabled = user_role != "admin"
+    rows = [notification_row(row, user_role) for _, row in df.iterrows()]
+
+    return dbc.Table([header] + rows, hover=True, striped=True, responsive=True, className="mb-0 shadow-sm")
+
 
-    for _, row in df.iterrows():
-        row_data = [
-            html.Td(row.id, className="p-2 border"),
-            html.Td(row.user_id, className="p-2 border"),
-            html.Td(row.message, className="p-2 border"),
-            html.Td(
-                "Yes" if row.delivered else "No",
-                style={"color": BLUE if row.delivered else "red", "fontWeight": "bold"},
-                className="p-2 border"
+def notification_row(row, user_role="student"):
+    is_disabled = user_role != "admin"
+    return html.Tr([
+        html.Td(row.id, className="p-2 border"),
+        html.Td(row.user_id, className="p-2 border"),
+        html.Td(row.message, className="p-2 border"),
+        html.Td(
+            "Yes" if row.delivered else "No",
+            style={"color": BLUE if row.delivered else "red", "fontWeight": "bold"},
+            className="p-2 border"
+        ),
+        html.Td([
+            dbc.Button(
+                "Edit",
+                id={"type": "edit-notif", "index": int(row.id)},
+                size="sm",
+                className="me-1",
+                disabled=is_disabled
             ),
-            html.Td([
-                dbc.Button(
-                    "Edit",
-                    id={"type": "edit-notif", "index": int(row.id)},
-                    size="sm",
-                    className="me-1",
-                    disabled=is_disabled
-                ),
-                dbc.Button(
-                    "Delete",
-                    id={"type": "delete-notif", "index": int(row.id)},
-                    size="sm",
-                    color="danger",
-                    disabled=is_disabled
-                )
-            ])
-        ]
-        rows.append(html.Tr(row_data))
+            dbc.Button(
+                "Delete",
+                id={"type": "delete-notif", "index": int(row.id)},
+                size="sm",
+                color="danger",
+                disabled=is_disabled
+            )
+        ])
+    ])
 
-    return dbc.Table([header] + rows, hover=True, striped=True, responsive=True, className="mb-0 shadow-sm")
+
+def notifications_table(df, version, text="", user_role="student"):
+    """The table of the notifications in df matching text, cached per data version, search and role."""
+    def render():
+        rows = df
+        if text:
+            t = text.lower()
+            rows = df[df.apply(lambda r: t in str(r).lower(), axis=1)]
+        return generate_notifications_table(rows, user_role)
+
+    return _render_cache.get(version, (text or "", user_role), render)
+
+
+def row_position(df, notif_id):
+    """Position of a notification in df (and so in the unfiltered table), or None."""
+    found = (df.id == notif_id).to_numpy().nonzero()[0]
+    return int(found[0]) if len(found) else None
 
 # ------------------ Layout ------------------
 def notifications_layout(user_role="student"):
-    df = read_notifications()
+    stamp, version, df = repository.notifications.stamped()
     is_disabled = user_role != "admin"
 
     return dbc.Container(fluid=True, children=[
@@ -138,9 +147,10 @@ def notifications_layout(user_role="student"):
                 className="form-control mb-3",
                 style={"maxWidth": "300px"}
             ),
+            dcc.Store(id="notif-rendered", data=[stamp, "", user_role]),
             html.Div(
                 id="table-notif",
-                children=generate_notifications_table(df, user_role)
+                children=notifications_table(df, version, "", user_role)
             )
         ])
     ])
@@ -148,13 +158,17 @@ def notifications_layout(user_role="student"):
 # ------------------ Callbacks ------------------
 def register_notifications_callbacks(app):
     # ------------------ Delete ------------------
+    # Writes patch just their row into the table on screen when it shows the
+    # current, unfiltered data, and re-render it otherwise
     @app.callback(
         Output("table-notif", "children", allow_duplicate=True),
+        Output("notif-rendered", "data", allow_duplicate=True),
         Input({"type": "delete-notif", "index": ALL}, "n_clicks"),
+        State("notif-rendered", "data"),
         State("session-user", "data"),
         prevent_initial_call=True
     )
-    def delete_notification(clicks, user_data):
+    def delete_notification(clicks, rendered, user_data):
         user = json.loads(user_data) if user_data else None
         user_role = user.get("role", "student") if user else "student"
         if user_role != "admin" or not any(clicks):
@@ -163,11 +177,17 @@ def register_notifications_callbacks(app):
         ctx = dash.callback_context
         notif_id = eval(ctx.triggered[0]["prop_id"].split(".")[0])["index"]
 
-        df = read_notifications()
-        df = df[df.id != notif_id]
-        save_notifications(df)
+        stamp, _, df = repository.notifications.stamped()
+        position = row_position(df, notif_id) if rendered == [stamp, "", user_role] else None
+
+        repository.notifications.delete(notif_id)
+        stamp, version, df = repository.notifications.stamped()
 
-        return generate_notifications_table(df, user_role)
+        if position is None:
+            return notifications_table(df, version, "", user_role), [stamp, "", user_role]
+        patch = Patch()
+        del patch["props"]["children"][position + 1]  # after the header row
+        return patch, [stamp, "", user_role]
 
     # ------------------ Edit / Reset ------------------
     @app.callback(
@@ -196,50 +216,67 @@ def register_notifications_callbacks(app):
             return None, "", None, "Add", None
 
         notif_id = eval(trigger.split(".")[0])["index"]
-        df = read_notifications()
-        r = df[df.id == notif_id].iloc[0]
-        return r.user_id, r.message, r.delivered, "Update", notif_id
+        r = repository.notifications.get(notif_id)
+        return r["user_id"], r["message"], r["delivered"], "Update", notif_id
 
     # ------------------ Add / Update ------------------
     @app.callback(
         Output("table-notif", "children", allow_duplicate=True),
+        Output("notif-rendered", "data", allow_duplicate=True),
         Input("add-notif-btn", "n_clicks"),
         State("notif-user-id", "value"),
         State("notif-message", "value"),
         State("notif-delivered", "value"),
         State("edit-notif-id", "data"),
+        State("notif-rendered", "data"),
         State("session-user", "data"),
         prevent_initial_call=True
     )
-    def save_notification(_, user_id, message, delivered, edit_id, user_data):
+    def save_notification(_, user_id, message, delivered, edit_id, rendered, user_data):
         user = json.loads(user_data) if user_data else None
         user_role = user.get("role", "student") if user else "student"
         if user_role != "admin" or user_id is None or not message or delivered is None:
             raise PreventUpdate
 
-        df = read_notifications()
+        stamp, _, df = repository.notifications.stamped()
+        current = rendered == [stamp, "", user_role]
+        position = row_position(df, edit_id) if edit_id is not None else None
+
+        values = {"user_id": user_id, "message": message, "delivered": delivered}
         if edit_id is not None:
-            df.loc[df.id == edit_id, ["user_id", "message", "delivered"]] = [user_id, message, delivered]
+            repository.notifications.update(edit_id, values)
         else:
-            new_id = int(df.id.max()) + 1 if not df.empty else 1
-            df = pd.concat([df, pd.DataFrame([{"id": new_id, "user_id": user_id, "message": message, "delivered": delivered}])], ignore_index=True)
+            repository.notifications.insert(values)
+        stamp, version, df = repository.notifications.stamped()
 
-        save_notifications(df)
-        return generate_notifications_table(df, user_role)
+        if not current or (edit_id is not None and position is None):
+            return notifications_table(df, version, "", user_role), [stamp, "", user_role]
+        patch = Patch()
+        if edit_id is not None:
+            patch["props"]["children"][position + 1] = notification_row(df.iloc[position], user_role)
+        else:
+            patch["props"]["children"].append(notification_row(df.iloc[-1], user_role))
+        return patch, [stamp, "", user_role]
 
-    # ------------------ Search ------------------
+    # ------------------ Search / Refresh ------------------
+    # notif-rendered holds (data version, search text, role) of the table on
+    # screen; the table is only rebuilt when one of them changed, checked on
+    # each search and whenever the data-versions store changes
     @app.callback(
         Output("table-notif", "children", allow_duplicate=True),
+        Output("notif-rendered", "data"),
         Input("search-notif", "value"),
+        Input("data-versions", "data"),
+        State("notif-rendered", "data"),
         State("session-user", "data"),
         prevent_initial_call=True
     )
-    def search_notifications(text, user_data):
+    def search_notifications(text, versions, rendered, user_data):
         user = json.loads(user_data) if user_data else None
         user_role = user.get("role", "student") if user else "student"
-        df = read_notifications()
-        if not text:
-            return generate_notifications_table(df, user_role)
-        t = text.lower()
-        df = df[df.apply(lambda r: t in str(r).lower(), axis=1)]
-        return generate_notifications_table(df, user_role)
+        stamp, version, df = repository.notifications.stamped()
+        key = [stamp, text or "", user_role]
+        if key == rendered:
+            raise PreventUpdate
+
+        return notifications_table(df, version, text, user_role), key
@@ -1,12 +1,8 @@
-import csv
 from dash import html
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output, State
 
-
-def read_users():
-    with open("data/users.csv", newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+from screens import repository
 
 
 def login_layout():
@@ -48,17 +44,17 @@ def login_callback(app):
         if not username or not password:
             return None, "Enter username & password"
 
-        for user in read_users():
-            if user["username"] == username and user["password"] == password:
-                if user["status"] != "active":
-                    return None, "Account inactive"
-
-                return {
-                    "username": user["username"],
-                    "full_name": user["full_name"],
-                    "email": user["email"],
-                    "role": user["role"],
-                    "status": user["status"],
-                }, ""
+        user = repository.users.find("username", username)
+        if user and user["password"] == password:
+            if user["status"] != "active":
+                return None, "Account inactive"
+
+            return {
+                "username": user["username"],
+                "full_name": user["full_name"],
+                "email": user["email"],
+                "role": user["role"],
+                "status": user["status"],
+            }, ""
 
         return None, "Invalid username or password"
@@ -0,0 +1,213 @@
+import base64
+import io
+
+import numpy as np
+import pandas as pd
+from dash import html, dcc
+import dash_bootstrap_components as dbc
+from flask import Response, jsonify, request, stream_with_context
+
+from screens import repository
+from screens.route_finder import routes_changed
+
+# CSV files are read and validated IMPORT_CHUNK_ROWS rows at a time and
+# written in one batch once every chunk is valid; at most MAX_IMPORT_ERRORS
+# row errors are reported (all of them are counted)
+IMPORT_CHUNK_ROWS = 50000
+MAX_IMPORT_ERRORS = 100
+
+# Exports are streamed EXPORT_CHUNK_ROWS rows per response chunk
+EXPORT_CHUNK_ROWS = 10000
+
+# Tables that can be imported / exported, with the checks their rows must
+# pass on top of their column types: (column, test on the typed values, message)
+BULK_TABLES = {
+    "routes": [("distance_m", lambda values: np.isfinite(values) & (values >= 0), "must be finite and not negative")],
+    "locations": [],
+}
+
+
+# ---------------- Validation ----------------
+def validate_chunk(table, chunk, first_line):
+    """Typed rows of one chunk of raw strings, and the errors of the rows that did not fit.
+
+    first_line is the file line number of the chunk's first row.
+    """
+    raw = chunk.reindex(columns=table.columns[1:]).apply(lambda values: values.str.strip())
+    typed = table.typed(raw.reindex(columns=table.columns))[raw.columns]
+
+    errors = []
+    lines = np.arange(first_line, first_line + len(chunk))
+    bad = np.zeros(len(chunk), dtype=bool)
+    for column in raw.columns:
+        missing = (raw[column] == "").to_numpy()
+        invalid = typed[column].isna().to_numpy() & ~missing
+        for mask, message in ((missing, "is missing"), (invalid, "is not a valid value")):
+            bad |= mask
+            errors += [(line, column, message, value) for line, value in zip(lines[mask], raw[column][mask])]
+
+    for column, test, message in BULK_TABLES[table.name]:
+        values = typed[column]
+        failed = (~test(values).fillna(True)).to_numpy(dtype=bool)
+        bad |= failed
+        errors += [(line, column, message, value) for line, value in zip(lines[failed], raw[column][failed])]
+
+    errors = [
+        {"line": int(line), "column": column, "value": value, "message": f"{column} {message}"}
+        for line, column, message, value in sorted(errors, key=lambda error: error[0])
+    ]
+    return typed[~bad], errors
+
+
+# ---------------- Import ----------------
+def import_csv(table, source, replace=False):
+    """Import the CSV rows in source (a path or file object) into table.
+
+    Rows get new ids (an id column in the file is ignored). Nothing is
+    written unless every row is valid; otherwise the report lists the first
+    MAX_IMPORT_ERRORS errors by file line.
+    """
+    report = {"table": table.name, "imported": 0, "replace": replace, "error_count": 0, "errors": []}
+
+    def fail(message, line=None):
+        report["error_count"] += 1
+        if len(report["errors"]) < MAX_IMPORT_ERRORS:
+            report["errors"].append({"line": line, "column": None, "value": None, "message": message})
+        return report
+
+    chunks = []
+    try:
+        reader = pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=IMPORT_CHUNK_ROWS)
+        first_line = 2  # line 1 is the header
+        for chunk in reader:
+            missing = [column for column in table.columns[1:] if column not in chunk.columns]
+            if missing:
+                return fail(f"Missing columns: {', '.join(missing)}", 1)
+
+            rows, errors = validate_chunk(table, chunk, first_line)
+            report["error_count"] += len(errors)
+            report["errors"] += errors[:MAX_IMPORT_ERRORS - len(report["errors"])]
+            if not report["error_count"]:
+                chunks.append(rows)
+            first_line += len(chunk)
+    except pd.errors.EmptyDataError:
+        return fail("The file is empty")
+    except (pd.errors.ParserError, UnicodeDecodeError) as e:
+        return fail(f"The file is not valid CSV: {e}")
+
+    if report["error_count"]:
+        return report
+    # A file with only a header still yields one (empty) chunk
+    if not sum(len(chunk) for chunk in chunks):
+        return fail("The file has no rows")
+
+    rows = pd.concat(chunks, ignore_index=True)
+    table.insert_many(rows, replace=replace)
+    report["imported"] = len(rows)
+    return report
+
+
+def import_upload(table, contents, replace=False):
+    """import_csv() for the base64 data URL a dcc.Upload hands to its callback."""
+    data = base64.b64decode(contents.split(",", 1)[-1])
+    return import_csv(table, io.BytesIO(data), replace)
+
+
+# ---------------- Export ----------------
+def export_csv(table):
+    """The table as CSV text, yielded EXPORT_CHUNK_ROWS rows at a time."""
+    df = table.frame()
+    yield ",".join(table.columns) + "\n"
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        yield df.iloc[start:start + EXPORT_CHUNK_ROWS].to_csv(header=False, index=False, float_format="%.15g")
+
+
+# ---------------- Layout ----------------
+def bulk_card(name):
+    """Upload / export controls for one of BULK_TABLES, placed on its management screen."""
+    return dbc.Card(className="mb-4 shadow-sm", children=[
+        dbc.CardBody([
+            html.H4("Bulk Import / Export", className="mb-3 text-secondary"),
+            dbc.Row([
+                dbc.Col(dcc.Upload(
+                    id=f"{name}-upload",
+                    children=html.Div(["Drop a CSV file here or ", html.A("select one")]),
+                    accept=".csv,text/csv",
+                    className="border rounded text-center p-3",
+                    style={"borderStyle": "dashed"}
+                ), md=6),
+                dbc.Col(dbc.Checklist(
+                    id=f"{name}-import-replace",
+                    options=[{"label": f"Replace all {name}", "value": "replace"}],
+                    value=[],
+                    switch=True
+                ), md=3, className="d-flex align-items-center"),
+                dbc.Col(html.A(
+                    dbc.Button("Export CSV", color="secondary"),
+                    href=f"/api/export/{name}.csv"
+                ), md=3, className="d-flex align-items-center justify-content-end"),
+            ]),
+            html.Div(id=f"{name}-import-result", className="mt-3")
+        ])
+    ])
+
+
+def import_result(report):
+    if not report["error_count"]:
+        action = "Replaced all rows with" if report["replace"] else "Imported"
+        return dbc.Alert(f"{action} {report['imported']} {report['table']}", color="success")
+
+    shown = report["errors"]
+    items = [
+        html.Li(f"Line {e['line']}: {e['message']}" + (f" ({e['value']!r})" if e["value"] else "")
+                if e["line"] else e["message"])
+        for e in shown
+    ]
+    more = report["error_count"] - len(shown)
+    return dbc.Alert([
+        html.Strong(f"Nothing imported: {report['error_count']} error(s)"),
+        html.Ul(items, className="mb-0 mt-2"),
+        html.Div(f"... and {more} more", className="mt-1") if more > 0 else None,
+    ], color="danger")
+
+
+# ---------------- API ----------------
+def admin_request():
+    """Whether the request carries HTTP basic auth credentials of an admin user."""
+    auth = request.authorization
+    if not auth or not auth.username:
+        return False
+    user = repository.users.find("username", auth.username)
+    return bool(user) and user["password"] == auth.password and user.get("role") == "admin"
+
+
+def register_bulk_api(app):
+    server = app.server
+
+    @server.route("/api/import/<name>", methods=["POST"])
+    def import_api(name):
+        if name not in BULK_TABLES:
+            return jsonify({"error": f"Unknown table {name!r}"}), 404
+        if not admin_request():
+            return jsonify({"error": "Admin credentials required"}), 401, {"WWW-Authenticate": "Basic"}
+
+        replace = request.args.get("replace", "").lower() in ("1", "true", "yes")
+        upload = request.files.get("file")
+        report = import_csv(repository.TABLES[name], upload.stream if upload else request.stream, replace)
+        if name == "routes" and report["imported"]:
+            routes_changed()
+        return jsonify(report), 400 if report["error_count"] else 200
+
+    # Exports need the same admin credentials as imports; the Export CSV
+    # link gets the 401 challenge, so the browser asks for them
+    @server.route("/api/export/<name>.csv")
+    def export_api(name):
+        if name not in BULK_TABLES:
+            return jsonify({"error": f"Unknown table {name!r}"}), 404
+        if not admin_request():
+            return jsonify({"error": "Admin credentials required"}), 401, {"WWW-Authenticate": "Basic"}
+        return Response(
+            stream_with_context(export_csv(repository.TABLES[name])),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f"attachment; filename={name}.csv"}
+        )
@@ -0,0 +1,113 @@
+import numpy as np
+from flask import jsonify, request
+
+from screens.route_finder import get_route_graph
+
+try:
+    from scipy.sparse.csgraph import dijkstra
+except ImportError:  # scipy is optional; fall back to one graph search per source
+    dijkstra = None
+
+# Largest request accepted in one call (pairs, or locations for a square matrix)
+MAX_PAIRS = 100000
+MAX_LOCATIONS = 2000
+
+# Start locations are searched SOURCE_CHUNK at a time, each search filling a
+# row over every location of the graph; a request may need at most
+# MAX_SEARCH_CELLS such entries (distinct known starts x graph locations)
+SOURCE_CHUNK = 64
+MAX_SEARCH_CELLS = 100_000_000
+
+
+# ---------------- Distance Matrix ----------------
+def search_cells(graph, starts):
+    """Entries the searches for these start locations fill in (see MAX_SEARCH_CELLS)."""
+    return len({start for start in starts if start in graph.location_index}) * len(graph.locations)
+
+
+def pair_distances(graph, pairs, accessible_only=False):
+    """Shortest distance of each (start, end) pair, None where unknown or unreachable.
+
+    Only the requested entries are kept from each chunk of SOURCE_CHUNK
+    searches, so memory stays at one chunk of rows however many pairs there are.
+    """
+    index = graph.location_index
+    starts = np.array([index.get(start, -1) for start, _ in pairs], dtype=np.int64)
+    ends = np.array([index.get(end, -1) for _, end in pairs], dtype=np.int64)
+    out = np.full(len(pairs), np.inf)
+
+    known = np.flatnonzero((starts >= 0) & (ends >= 0))
+    known = known[np.argsort(starts[known], kind="stable")]
+    known_starts = starts[known]
+    sources = np.unique(known_starts)
+    matrix = graph.sparse_matrix(accessible_only) if dijkstra is not None else None
+
+    for first in range(0, len(sources), SOURCE_CHUNK):
+        chunk = sources[first:first + SOURCE_CHUNK]
+        if matrix is not None:
+            dist = dijkstra(matrix, indices=chunk)
+        else:
+            dist = np.full((len(chunk), len(graph.locations)), np.inf)
+            for i, source in enumerate(chunk):
+                for name, d in graph.distances_from(graph.locations[source], accessible_only).items():
+                    dist[i, index[name]] = d
+
+        lo = np.searchsorted(known_starts, chunk[0], side="left")
+        hi = np.searchsorted(known_starts, chunk[-1], side="right")
+        picked = known[lo:hi]
+        out[picked] = dist[np.searchsorted(chunk, starts[picked]), ends[picked]]
+
+    return [float(d) if np.isfinite(d) else None for d in out]
+
+
+# ---------------- API ----------------
+def register_distance_api(app):
+    server = app.server
+
+    @server.route("/api/distance-matrix", methods=["POST"])
+    def distance_matrix_api():
+        body = request.get_json(silent=True) or {}
+        accessible_only = bool(body.get("accessible_only", False))
+        pairs = body.get("pairs")
+        locations = body.get("locations")
+
+        graph = get_route_graph()
+
+        if pairs is not None:
+            if not isinstance(pairs, list) or not all(
+                isinstance(p, list) and len(p) == 2 and all(isinstance(name, str) for name in p)
+                for p in pairs
+            ):
+                return jsonify({"error": "pairs must be a list of [start, end] pairs"}), 400
+            if len(pairs) > MAX_PAIRS:
+                return jsonify({"error": f"At most {MAX_PAIRS} pairs per request"}), 400
+            if search_cells(graph, [start for start, _ in pairs]) > MAX_SEARCH_CELLS:
+                return jsonify({"error": "Too many distinct start locations for one request"}), 400
+
+            distances = pair_distances(graph, pairs, accessible_only)
+            return jsonify({
+                "accessible_only": accessible_only,
+                "results": [
+                    {"start": start, "end": end, "distance_m": d}
+                    for (start, end), d in zip(pairs, distances)
+                ],
+            })
+
+        if locations is not None:
+            if not isinstance(locations, list) or not all(isinstance(name, str) for name in locations):
+                return jsonify({"error": "locations must be a list of location names"}), 400
+            if len(locations) > MAX_LOCATIONS:
+                return jsonify({"error": f"At most {MAX_LOCATIONS} locations per request"}), 400
+            if search_cells(graph, locations) > MAX_SEARCH_CELLS:
+                return jsonify({"error": "Too many locations for one request"}), 400
+
+            n = len(locations)
+            distances = pair_distances(graph, [(start, end) for start in locations for end in locations], accessible_only)
+            return jsonify({
+                "accessible_only": accessible_only,
+                "locations": locations,
+                "unknown": [name for name in locations if name not in graph],
+                "distances_m": [distances[i * n:(i + 1) * n] for i in range(n)],
+            })
+
+        return jsonify({"error": "Send either 'pairs' or 'locations'"}), 400
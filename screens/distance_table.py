@@ -0,0 +1,279 @@
+import copy
+import threading
+
+import numpy as np
+
+from screens.route_graph import make_path
+
+try:
+    from scipy.sparse.csgraph import csgraph_from_dense, dijkstra
+except ImportError:  # scipy is optional; repairs then search one row at a time
+    dijkstra = None
+
+# Dense V x V tables stop paying off past this size: Floyd-Warshall is
+# cubic (about a second at 500 locations, ten at 1000) and every worker
+# builds two of them (full and accessible-only) per graph change
+MAX_TABLE_LOCATIONS = 500
+
+
+def first_hops(sources, predecessors):
+    """next_hop rows from dijkstra() predecessor rows: the first location after each source on its path (-1 if unreachable)."""
+    count, n = predecessors.shape
+    up = np.where(predecessors == sources[:, None], np.arange(n), predecessors)
+    up[np.arange(count), sources] = sources
+    # Unreachable locations point at an extra column that points at itself
+    up = np.concatenate([np.where(up < 0, n, up), np.full((count, 1), n)], axis=1)
+    while True:
+        jumped = np.take_along_axis(up, up, axis=1)
+        if np.array_equal(jumped, up):
+            break
+        up = jumped
+    return np.where(up[:, :n] == n, -1, up[:, :n])
+
+
+# ---------------- All-Pairs Distance Table ----------------
+class DistanceTable:
+    """Precomputed shortest distance / next-hop matrices over a RouteGraph.
+
+    weights/route_ids/accessible hold the best direct route per location
+    pair; dist/next_hop hold all-pairs shortest paths. Single route edits
+    are repaired in place with update_pair() instead of a full rebuild, so
+    a table being read must be copy()'d first. With accessible_only the
+    table covers the accessible-only subgraph.
+    """
+
+    def __init__(self, graph, accessible_only=False):
+        self.accessible_only = accessible_only
+        self.locations = graph.locations
+        self.index = {name: i for i, name in enumerate(self.locations)}
+        n = len(self.locations)
+
+        self.weights = np.full((n, n), np.inf)
+        self.route_ids = np.full((n, n), -1, dtype=np.int64)
+        self.accessible = np.zeros((n, n), dtype=bool)
+
+        # Location ids in the graph are already in sorted-name order, so they index the table directly
+        rows, cols, slots = graph.pair_edges(accessible_only)
+        self.weights[rows, cols] = graph.distances[slots]
+        self.route_ids[rows, cols] = graph.route_ids[slots]
+        self.accessible[rows, cols] = graph.slot_accessible()[slots]
+        np.fill_diagonal(self.weights, 0.0)
+
+        self._floyd_warshall()
+
+    def __contains__(self, location):
+        return location in self.index
+
+    def copy(self):
+        table = copy.copy(self)
+        for name in ("weights", "route_ids", "accessible", "dist", "next_hop"):
+            setattr(table, name, getattr(self, name).copy())
+        return table
+
+    def _set_pair(self, i, j, weight, accessible, route_id):
+        self.weights[i, j] = self.weights[j, i] = weight
+        self.accessible[i, j] = self.accessible[j, i] = accessible
+        self.route_ids[i, j] = self.route_ids[j, i] = -1 if route_id is None else route_id
+
+    def _floyd_warshall(self):
+        n = len(self.locations)
+        dist = self.weights.copy()
+        next_hop = np.where(np.isfinite(dist), np.arange(n)[None, :], -1)
+
+        for k in range(n):
+            via = dist[:, k, None] + dist[None, k, :]
+            better = via < dist
+            dist = np.where(better, via, dist)
+            next_hop = np.where(better, next_hop[:, k, None], next_hop)
+
+        self.dist = dist
+        self.next_hop = next_hop
+
+    # ---------------- Lookups ----------------
+    def distance(self, start, end):
+        if start not in self.index or end not in self.index:
+            return None
+        d = self.dist[self.index[start], self.index[end]]
+        return float(d) if np.isfinite(d) else None
+
+    def path(self, start, end):
+        """The shortest path from start to end, or None.
+
+        Also None, for callers to fall back to a graph search, should the
+        next hops not lead to end within one step per location.
+        """
+        if self.distance(start, end) is None:
+            return None
+
+        i, j = self.index[start], self.index[end]
+        legs = []
+        for _ in range(len(self.locations)):
+            if i == j:
+                return make_path(start, legs)
+            k = int(self.next_hop[i, j])
+            route_id = int(self.route_ids[i, k])
+            legs.append({
+                "from": self.locations[i],
+                "to": self.locations[k],
+                "distance_m": float(self.weights[i, k]),
+                "accessible": bool(self.accessible[i, k]),
+                "route_id": None if route_id < 0 else route_id,
+            })
+            i = k
+
+        return make_path(start, legs) if i == j else None
+
+    # ---------------- Incremental Repair ----------------
+    def update_pair(self, start, end, best_edge):
+        """Repair the tables after the best route between start and end changed.
+
+        best_edge is graph.best_edge(start, end): (weight, accessible,
+        route_id), or None when no route is left between the two.
+        """
+        i, j = self.index[start], self.index[end]
+        if i == j:
+            return
+
+        old = self.weights[i, j]
+        weight, accessible, route_id = best_edge if best_edge else (np.inf, False, None)
+        self._set_pair(i, j, weight, accessible, route_id)
+
+        if weight <= old:
+            self._relax_through(i, j, weight)
+        else:
+            self._recompute_rows(self._rows_using(i, j, old))
+
+    def _relax_through(self, i, j, weight):
+        if not np.isfinite(weight):
+            return
+
+        dist = self.dist
+        candidates = []
+        for a, b in ((i, j), (j, i)):
+            # s -> a -> b -> t; the first hop is the one towards a, or b itself from a
+            first = self.next_hop[:, a].copy()
+            first[a] = b
+            via = dist[:, a, None] + weight + dist[None, b, :]
+            candidates.append((via, first))
+
+        for via, first in candidates:
+            better = via < self.dist
+            self.dist = np.where(better, via, self.dist)
+            self.next_hop = np.where(better, first[:, None], self.next_hop)
+
+    def _rows_using(self, i, j, old_weight):
+        if not np.isfinite(old_weight):
+            return np.array([], dtype=np.int64)
+
+        dist = self.dist
+        tol = 1e-9 * np.maximum(1.0, np.abs(dist))
+        finite = np.isfinite(dist)
+        uses = np.zeros(dist.shape[0], dtype=bool)
+        for a, b in ((i, j), (j, i)):
+            via = dist[:, a, None] + old_weight + dist[None, b, :]
+            uses |= (finite & (via <= dist + tol)).any(axis=1)
+        return np.flatnonzero(uses)
+
+    def _recompute_rows(self, rows):
+        if not len(rows):
+            return
+        if dijkstra is None:
+            for s in rows:
+                self.dist[s], self.next_hop[s] = self._dijkstra_row(s)
+            return
+
+        # inf marks the missing routes, so zero-length routes stay edges
+        graph = csgraph_from_dense(self.weights, null_value=np.inf)
+        dist, predecessors = dijkstra(graph, indices=rows, return_predecessors=True)
+        self.dist[rows] = dist
+        self.next_hop[rows] = first_hops(rows, predecessors)
+
+    def _dijkstra_row(self, s):
+        n = len(self.locations)
+        dist = np.full(n, np.inf)
+        first = np.full(n, -1, dtype=self.next_hop.dtype)
+        done = np.zeros(n, dtype=bool)
+        dist[s] = 0.0
+        first[s] = s
+
+        for _ in range(n):
+            u = int(np.argmin(np.where(done, np.inf, dist)))
+            if done[u] or not np.isfinite(dist[u]):
+                break
+            done[u] = True
+
+            nd = dist[u] + self.weights[u]
+            better = (nd < dist) & ~done
+            dist[better] = nd[better]
+            first[better] = np.flatnonzero(better) if u == s else first[u]
+
+        return dist, first
+
+
+# ---------------- Background Maintenance ----------------
+class BackgroundDistanceTable:
+    """Keeps a DistanceTable in step with the routes graph off the request path.
+
+    get() only hands out a table that matches the latest graph; while a
+    rebuild or repair is pending callers fall back to a graph search.
+    Repairs are made on a copy that replaces the table once done, so a
+    table handed out is never changed under its readers.
+    """
+
+    def __init__(self, accessible_only=False):
+        self.accessible_only = accessible_only
+        self.lock = threading.Lock()
+        self.table = None
+        self.graph = None
+        self.changed_pairs = set()
+        self.full_rebuild = True
+        self.ready = False
+        self.worker = None
+
+    def get(self):
+        with self.lock:
+            return self.table if self.ready else None
+
+    def rebuild(self, graph):
+        with self.lock:
+            self.graph = graph
+            self.full_rebuild = True
+            self.ready = False
+            self._start_worker()
+
+    def routes_changed(self, graph, pairs):
+        with self.lock:
+            self.graph = graph
+            self.changed_pairs.update(pairs)
+            self.ready = False
+            self._start_worker()
+
+    def _start_worker(self):
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self._run, daemon=True)
+            self.worker.start()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                graph = self.graph
+                pairs = self.changed_pairs
+                full = self.full_rebuild or self.table is None
+                self.changed_pairs = set()
+                self.full_rebuild = False
+
+            if len(graph.locations) > MAX_TABLE_LOCATIONS:
+                table = None
+            elif full or any(p not in self.table for pair in pairs for p in pair):
+                table = DistanceTable(graph, self.accessible_only)
+            else:
+                table = self.table.copy()
+                for start, end in pairs:
+                    table.update_pair(start, end, graph.best_edge(start, end, self.accessible_only))
+
+            with self.lock:
+                self.table = table
+                if self.graph is graph and not self.changed_pairs and not self.full_rebuild:
+                    self.ready = table is not None
+                    self.worker = None
+                    return
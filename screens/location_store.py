@@ -0,0 +1,181 @@
+import threading
+from collections import OrderedDict
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from screens import repository
+from screens.search_index import NameSearchIndex
+
+# Filtered / sorted views kept per store, most recently used last
+VIEW_CACHE_SIZE = 8
+
+# Columns a view can be sorted by (besides table order)
+SORT_COLUMNS = ["name", "building", "floor"]
+
+NO_ROWS = np.zeros(0, dtype=np.intp)
+
+
+def inverted_lists(values):
+    """value -> sorted row positions holding it (missing values are left out)."""
+    values = values.reset_index(drop=True)
+    return dict(values.groupby(values, observed=True, sort=False).indices)
+
+
+def gather(order, bounds, ids):
+    """Concatenation of the groups order[bounds[i]:bounds[i + 1]] for every i in ids."""
+    starts, ends = bounds[ids], bounds[np.asarray(ids) + 1]
+    lengths = ends - starts
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return order[np.repeat(starts, lengths) + offsets]
+
+
+# ---------------- Location Store ----------------
+class LocationStore:
+    """The locations of one table version, addressed by row position and by id.
+
+    Built once per version of repository.locations and then only read, so
+    the locations screen can hand out any window of rows (for the rows in a
+    scrolled viewport) or find one location without scanning the frame.
+
+    Filters are answered from indexes built the first time they are needed:
+    inverted lists of row positions per building and per floor, an
+    accessibility bitmap and the trigram index of the names. A view
+    intersects the position lists of its filters, smallest first, and is
+    then ordered by the precomputed rank of its sort column.
+    """
+
+    def __init__(self, version, df):
+        self.version = version
+        self.df = df
+        self.ids = pd.Index(df.id.to_numpy())
+        self._views = OrderedDict()
+        self._ranks = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.df)
+
+    def position(self, loc_id):
+        """Row position of a location, or None."""
+        if self.ids.is_unique:
+            found = self.ids.get_indexer([loc_id])
+        else:
+            found = (self.ids == loc_id).nonzero()[0][:1]
+        return int(found[0]) if len(found) and found[0] >= 0 else None
+
+    def get(self, loc_id):
+        position = self.position(loc_id)
+        return None if position is None else self.df.iloc[position]
+
+    def window(self, start, count, view=None):
+        """(start, rows) of the count rows of view (row positions; all rows by default) from start on.
+
+        start is clamped so the window stays inside the view.
+        """
+        total = len(self.df) if view is None else len(view)
+        start = min(max(start or 0, 0), max(total - count, 0))
+        if view is None:
+            return start, self.df.iloc[start:start + count]
+        return start, self.df.iloc[view[start:start + count]]
+
+    # ---------------- Indexes ----------------
+    @cached_property
+    def buildings(self):
+        return inverted_lists(self.df.building)
+
+    @cached_property
+    def floors(self):
+        return inverted_lists(self.df.floor)
+
+    @cached_property
+    def accessible(self):
+        """Bitmap of the accessible locations (unknown counts as not accessible)."""
+        return self.df.accessible.fillna(False).to_numpy(dtype=bool)
+
+    @cached_property
+    def names(self):
+        return NameSearchIndex(self.df.name.fillna(""))
+
+    @cached_property
+    def name_rows(self):
+        """(row positions grouped by name id, where each name's group starts)"""
+        codes = pd.Categorical(self.df.name.fillna(""), categories=self.names.names).codes
+        order = np.argsort(codes, kind="stable")
+        return order, np.searchsorted(codes[order], np.arange(len(self.names) + 1))
+
+    def name_positions(self, text):
+        ids = self.names.containing_ids(text.strip().lower())
+        if not len(ids):
+            return NO_ROWS
+        return np.sort(gather(*self.name_rows, ids))
+
+    def ranks(self, column):
+        """Each row's place in column order (names case-insensitive, missing values last)."""
+        with self._lock:
+            if column not in self._ranks:
+                values = self.df[column].reset_index(drop=True)
+                if column == "name":
+                    values = values.str.lower()
+                elif isinstance(values.dtype, pd.CategoricalDtype):
+                    values = values.astype("string")
+                order = values.sort_values(kind="stable", na_position="last").index.to_numpy()
+                ranks = np.empty(len(order), dtype=np.intp)
+                ranks[order] = np.arange(len(order))
+                self._ranks[column] = ranks
+            return self._ranks[column]
+
+    # ---------------- Views ----------------
+    def select(self, building=None, floor=None, accessible=None, name=None, sort=None):
+        """Row positions of the locations matching every given filter, in sort column order.
+
+        Unset filters (None, or an empty name) match everything; sort=None
+        keeps table order. Returns None for the unfiltered table in table order.
+        """
+        key = (building, floor, accessible, name or None, sort if sort in SORT_COLUMNS else None)
+        if key == (None,) * 5:
+            return None
+        with self._lock:
+            if key in self._views:
+                self._views.move_to_end(key)
+                return self._views[key]
+
+        lists = []
+        if building is not None:
+            lists.append(self.buildings.get(building, NO_ROWS))
+        if floor is not None:
+            lists.append(self.floors.get(floor, NO_ROWS))
+        if name:
+            lists.append(self.name_positions(name))
+
+        view = None
+        for positions in sorted(lists, key=len):
+            view = positions if view is None else np.intersect1d(view, positions, assume_unique=True)
+        if accessible is not None:
+            bitmap = self.accessible if accessible else ~self.accessible
+            view = np.flatnonzero(bitmap) if view is None else view[bitmap[view]]
+        if view is None:
+            view = np.arange(len(self.df))
+        if key[-1] is not None:
+            view = view[np.argsort(self.ranks(key[-1])[view], kind="stable")]
+
+        with self._lock:
+            self._views[key] = view
+            while len(self._views) > VIEW_CACHE_SIZE:
+                self._views.popitem(last=False)
+        return view
+
+
+_store_cache = {"store": None}
+_store_lock = threading.Lock()
+
+
+def location_store():
+    """(data stamp, LocationStore) of the current locations table; the store is rebuilt when it changes."""
+    stamp, version, df = repository.locations.stamped()
+    with _store_lock:
+        store = _store_cache["store"]
+        if store is None or store.version != version or store.df is not df:
+            store = _store_cache["store"] = LocationStore(version, df)
+        return stamp, store
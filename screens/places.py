@@ -1,39 +1,29 @@
-import os
-import pandas as pd
 import dash
-from dash import html, dcc, Input, Output, State
+from dash import html, dcc, Input, Output, State, Patch, ClientsideFunction
 from dash.dependencies import ALL
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 
-# ------------------ Config ------------------
-CSV_PATH = "data/locations.csv"
-os.makedirs("data", exist_ok=True)
+from screens import repository
+from screens.bulk_io import bulk_card, import_upload, import_result
+from screens.location_store import location_store, SORT_COLUMNS
+from screens.render_cache import RenderCache
 
-# ------------------ CSV Read / Write ------------------
-def read_locations():
-    if os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
+# Tables of more than VIRTUAL_ROWS locations are virtualized: only a window
+# of WINDOW_ROWS rows around the scrolled viewport (VIEWPORT_ROWS rows high)
+# is rendered, fetched from the server as the admin scrolls (see
+# assets/virtual_scroll.js). Rows have a fixed ROW_HEIGHT so the window can
+# be placed where the full table would have those rows.
+VIRTUAL_ROWS = 500
+WINDOW_ROWS = 60
+VIEWPORT_ROWS = 15
+ROW_HEIGHT = 42
 
-        # FIX boolean from CSV
-        df["accessible"] = df["accessible"].apply(
-            lambda x: True if str(x).lower() == "true" else False
-        )
-
-        return df
-
-    return pd.DataFrame(columns=["id", "name", "building", "floor", "accessible"])
-
-
-def save_locations(df):
-    df.to_csv(CSV_PATH, index=False)
+_render_cache = RenderCache()
 
 # ------------------ Table ------------------
-def generate_locations_table(df):
-    if df.empty:
-        return dbc.Alert("No locations found", color="warning")
-
-    header = html.Tr([
+def locations_header():
+    return html.Tr([
         html.Th("ID"),
         html.Th("Name"),
         html.Th("Building"),
@@ -42,31 +32,14 @@ def generate_locations_table(df):
         html.Th("Actions"),
     ])
 
-    rows = []
-    for _, row in df.iterrows():
-        rows.append(
-            html.Tr([
-                html.Td(row.id),
-                html.Td(row.name),
-                html.Td(row.building),
-                html.Td(row.floor),
-                html.Td("Yes" if row.accessible else "No"),
-                html.Td([
-                    dbc.Button(
-                        "Edit",
-                        id={"type": "edit-loc", "index": row.id},
-                        size="sm",
-                        className="btn-edit me-1"
-                    ),
-                    dbc.Button(
-                        "Delete",
-                        id={"type": "delete-loc", "index": row.id},
-                        size="sm",
-                        className="btn-delete"
-                    )
-                ])
-            ])
-        )
+
+def generate_locations_table(df):
+    if df.empty:
+        return dbc.Alert("No locations found", color="warning")
+
+    header = locations_header()
+
+    rows = [location_row(row) for _, row in df.iterrows()]
 
     return dbc.Table(
         [header] + rows,
@@ -77,9 +50,134 @@ def generate_locations_table(df):
         className="shadow-sm"
     )
 
+def location_row(row):
+    return html.Tr([
+        html.Td(row.id),
+        html.Td(row["name"]),
+        html.Td(row.building),
+        html.Td(row.floor),
+        html.Td("Yes" if row.accessible else "No"),
+        html.Td([
+            dbc.Button(
+                "Edit",
+                id={"type": "edit-loc", "index": int(row.id)},
+                size="sm",
+                className="btn-edit me-1"
+            ),
+            dbc.Button(
+                "Delete",
+                id={"type": "delete-loc", "index": int(row.id)},
+                size="sm",
+                className="btn-delete"
+            )
+        ])
+    ])
+
+
+# ------------------ Filters ------------------
+def location_query(building=None, floor=None, accessible=None, name=None, sort=None):
+    """The filters and sort column set on the screen, as keyword arguments of LocationStore.select()."""
+    query = {"building": building, "floor": floor, "accessible": accessible, "name": (name or "").strip(), "sort": sort}
+    return {key: value for key, value in query.items() if value is not None and value != ""}
+
+
+def locations_table(store, query=None, virtual=False):
+    """The locations matching query, as a virtual or a plain table (cached per store version)."""
+    query = query or {}
+
+    def render():
+        view = store.select(**query)
+        if virtual:
+            return virtual_locations_table(store, view)
+        return generate_locations_table(store.df if view is None else store.df.iloc[view])
+
+    return _render_cache.get(store.version, ("table", virtual, tuple(sorted(query.items()))), render)
+
+
+def filter_controls(store):
+    return dbc.Row(className="mb-3 g-2", children=[
+        dbc.Col(dcc.Input(
+            id="filter-loc-name",
+            placeholder="Name contains",
+            className="form-control"
+        ), md=3),
+
+        dbc.Col(dcc.Dropdown(
+            id="filter-loc-building",
+            options=sorted(store.buildings),
+            placeholder="Building"
+        ), md=2),
+
+        dbc.Col(dcc.Dropdown(
+            id="filter-loc-floor",
+            options=[int(floor) for floor in sorted(store.floors)],
+            placeholder="Floor"
+        ), md=2),
+
+        dbc.Col(dcc.Dropdown(
+            id="filter-loc-accessible",
+            options=[
+                {"label": "Accessible", "value": True},
+                {"label": "Not Accessible", "value": False},
+            ],
+            placeholder="Accessible"
+        ), md=2),
+
+        dbc.Col(dcc.Dropdown(
+            id="sort-loc",
+            options=[{"label": f"Sort by {column}", "value": column} for column in SORT_COLUMNS],
+            placeholder="Sort by ID"
+        ), md=3),
+    ])
+
+# ------------------ Virtual Table ------------------
+def locations_window(store, start=0, view=None):
+    """(window rows, window table style, spacer style) of the rows of view from start on."""
+    start, rows = store.window(start, WINDOW_ROWS, view)
+    total = len(store) if view is None else len(view)
+    return (
+        [location_row(row) for _, row in rows.iterrows()],
+        {"position": "absolute", "top": f"{start * ROW_HEIGHT}px", "width": "100%", "tableLayout": "fixed"},
+        {"height": f"{(total + 1) * ROW_HEIGHT}px"},  # every row plus the header
+    )
+
+
+def virtual_locations_table(store, view=None):
+    rows, table_style, spacer_style = locations_window(store, 0, view)
+    return html.Div(
+        id="locations-scroll",
+        className="locations-virtual",
+        style={
+            "height": f"{(VIEWPORT_ROWS + 1) * ROW_HEIGHT}px",
+            "overflowY": "auto",
+            "position": "relative",
+            "--row-height": f"{ROW_HEIGHT}px",
+        },
+        **{
+            "data-viewport": "locations-viewport",
+            "data-row-height": ROW_HEIGHT,
+            "data-window-rows": WINDOW_ROWS,
+        },
+        children=[
+            html.Div(id="locations-spacer", style=spacer_style),
+            dbc.Table(
+                [html.Thead(locations_header()), html.Tbody(id="locations-window", children=rows)],
+                id="locations-window-table",
+                hover=True,
+                striped=True,
+                className="mb-0",
+                style=table_style
+            ),
+        ]
+    )
+
 # ------------------ Layout ------------------
-def locations_layout():
-    df = read_locations()
+def locations_layout(virtual=None):
+    """The locations screen; virtual picks the table mode (by default, virtual for big tables)."""
+    stamp, store = location_store()
+    if virtual is None:
+        virtual = len(store) > VIRTUAL_ROWS
+    table = locations_table(store, virtual=virtual)
 
     return dbc.Container(fluid=True, children=[
 
@@ -103,11 +201,14 @@ def locations_layout():
                         className="form-control"
                     ), md=3),
 
-                    dbc.Col(dcc.Input(
-                        id="loc-floor",
-                        placeholder="Floor",
-                        className="form-control"
-                    ), md=3),
+                    dbc.Col([
+                        dcc.Input(
+                            id="loc-floor",
+                            placeholder="Floor",
+                            className="form-control"
+                        ),
+                        html.Div("Floor must be a whole number", className="invalid-feedback")
+                    ], md=3),
 
                     dbc.Col(dcc.Dropdown(
                         id="loc-accessible",
@@ -132,8 +233,15 @@ def locations_layout():
             ])
         ]),
 
+        bulk_card("locations"),
+
         dbc.Card(className="p-3 shadow-sm", children=[
-            html.Div(id="table-loc", children=generate_locations_table(df))
+            filter_controls(store),
+            dcc.Store(id="locations-rendered", data=stamp),
+            dcc.Store(id="locations-query", data={}),
+            # The window scrolled to in the virtual table; None for a plain table
+            dcc.Store(id="locations-viewport", data={"start": 0} if virtual else None),
+            html.Div(id="table-loc", children=table)
         ])
 
     ])
@@ -146,21 +254,37 @@ def register_locations_callbacks(app):
     # ------------------ DELETE ------------------
     @app.callback(
         Output("table-loc", "children", allow_duplicate=True),
+        Output("locations-rendered", "data", allow_duplicate=True),
         Input({"type": "delete-loc", "index": ALL}, "n_clicks"),
+        State("locations-rendered", "data"),
+        State("locations-viewport", "data"),
+        State("locations-query", "data"),
         prevent_initial_call=True
     )
-    def delete_location(clicks):
+    def delete_location(clicks, rendered, viewport, query):
         if not any(clicks):
             raise PreventUpdate
 
         ctx = dash.callback_context
         loc_id = ctx.triggered_id["index"]
 
-        df = read_locations()
-        df = df[df.id != loc_id]
-        save_locations(df)
+        stamp, store = location_store()
+        position = store.position(loc_id) if stamp == rendered and not query else None
 
-        return generate_locations_table(df)
+        repository.locations.delete(loc_id)
+        stamp, store = location_store()
+
+        # A virtual table refreshes its window when the stamp changes
+        if viewport is not None:
+            return dash.no_update, stamp
+
+        # Only the deleted row leaves the table on screen, if that table is
+        # current and neither filtered nor sorted
+        if position is None or not len(store):
+            return locations_table(store, query), stamp
+        patch = Patch()
+        del patch["props"]["children"][position + 1]  # after the header row
+        return patch, stamp
 
     # ------------------ EDIT + RESET (SINGLE CALLBACK) ------------------
     @app.callback(
@@ -177,7 +301,8 @@ def register_locations_callbacks(app):
     def handle_edit_reset(edit_clicks, reset_click):
         ctx = dash.callback_context
 
-        if not ctx.triggered:
+        # Buttons of newly rendered rows (a scrolled window) trigger without a click
+        if not ctx.triggered or not ctx.triggered[0]["value"]:
             raise PreventUpdate
 
         trigger = ctx.triggered[0]["prop_id"]
@@ -188,14 +313,13 @@ def register_locations_callbacks(app):
 
         # -------- EDIT --------
         loc_id = ctx.triggered_id["index"]
-        df = read_locations()
-        row = df[df.id == loc_id].iloc[0]
+        row = repository.locations.get(loc_id)
 
         return (
-            row.name,
-            row.building,
-            row.floor,
-            row.accessible,
+            row["name"],
+            row["building"],
+            row["floor"],
+            row["accessible"],
             "Update",
             loc_id
         )
@@ -203,36 +327,158 @@ def register_locations_callbacks(app):
     # ------------------ ADD / UPDATE ------------------
     @app.callback(
         Output("table-loc", "children", allow_duplicate=True),
+        Output("locations-rendered", "data", allow_duplicate=True),
+        Output("loc-floor", "className"),
         Input("add-loc-btn", "n_clicks"),
         State("loc-name", "value"),
         State("loc-building", "value"),
         State("loc-floor", "value"),
         State("loc-accessible", "value"),
         State("edit-loc-id", "data"),
+        State("locations-rendered", "data"),
+        State("locations-viewport", "data"),
+        State("locations-query", "data"),
         prevent_initial_call=True
     )
-    def save_location(_, name, building, floor, accessible, edit_id):
+    def save_location(_, name, building, floor, accessible, edit_id, rendered, viewport, query):
         if not name or not building or not floor or accessible is None:
             raise PreventUpdate
 
-        df = read_locations()
+        # Marked on the input instead of being stored as a missing floor
+        try:
+            floor = repository.locations.coerce("floor", floor)
+        except ValueError:
+            return dash.no_update, dash.no_update, "form-control is-invalid"
+
+        values = {
+            "name": name,
+            "building": building,
+            "floor": floor,
+            "accessible": accessible
+        }
+
+        stamp, store = location_store()
+        current = stamp == rendered and len(store) > 0 and not query
+        position = store.position(edit_id) if edit_id is not None else None
 
         if edit_id is not None:
-            df.loc[df.id == edit_id, ["name", "building", "floor", "accessible"]] = [
-                name, building, floor, accessible
-            ]
+            repository.locations.update(edit_id, values)
         else:
-            new_id = int(df.id.max()) + 1 if not df.empty else 1
-            df = pd.concat([
-                df,
-                pd.DataFrame([{
-                    "id": new_id,
-                    "name": name,
-                    "building": building,
-                    "floor": floor,
-                    "accessible": accessible
-                }])
-            ], ignore_index=True)
-
-        save_locations(df)
-        return generate_locations_table(df)
+            repository.locations.insert(values)
+        stamp, store = location_store()
+        df = store.df
+
+        if viewport is not None:
+            return dash.no_update, stamp, "form-control"
+
+        # Only the saved row changes in the table on screen, if that table is
+        # current and neither filtered nor sorted
+        if not current or (edit_id is not None and position is None):
+            return locations_table(store, query), stamp, "form-control"
+        patch = Patch()
+        if edit_id is not None:
+            patch["props"]["children"][position + 1] = location_row(df.iloc[position])
+        else:
+            patch["props"]["children"].append(location_row(df.iloc[-1]))
+        return patch, stamp, "form-control"
+
+    # ------------------ BULK IMPORT ------------------
+    @app.callback(
+        Output("table-loc", "children", allow_duplicate=True),
+        Output("locations-rendered", "data", allow_duplicate=True),
+        Output("locations-import-result", "children"),
+        Output("locations-upload", "contents"),
+        Input("locations-upload", "contents"),
+        State("locations-import-replace", "value"),
+        State("locations-viewport", "data"),
+        State("locations-query", "data"),
+        prevent_initial_call=True
+    )
+    def import_locations(contents, replace, viewport, query):
+        if not contents:
+            raise PreventUpdate
+
+        report = import_upload(repository.locations, contents, replace=bool(replace))
+
+        stamp, store = location_store()
+        table = dash.no_update if viewport is not None else locations_table(store, query)
+
+        return table, stamp, import_result(report), None
+
+    # ------------------ REFRESH ------------------
+    # Re-render when the locations table changed elsewhere (another admin or worker)
+    @app.callback(
+        Output("table-loc", "children", allow_duplicate=True),
+        Output("locations-rendered", "data", allow_duplicate=True),
+        Input("data-versions", "data"),
+        State("locations-rendered", "data"),
+        State("locations-viewport", "data"),
+        State("locations-query", "data"),
+        prevent_initial_call=True
+    )
+    def refresh_locations(_, rendered, viewport, query):
+        stamp, store = location_store()
+        if stamp == rendered:
+            raise PreventUpdate
+
+        return dash.no_update if viewport is not None else locations_table(store, query), stamp
+
+    # ------------------ FILTER / SORT ------------------
+    # A new query re-renders the table (a virtual one scrolled back to the top)
+    @app.callback(
+        Output("table-loc", "children", allow_duplicate=True),
+        Output("locations-rendered", "data", allow_duplicate=True),
+        Output("locations-query", "data"),
+        Output("locations-viewport", "data"),
+        Input("filter-loc-building", "value"),
+        Input("filter-loc-floor", "value"),
+        Input("filter-loc-accessible", "value"),
+        Input("filter-loc-name", "value"),
+        Input("sort-loc", "value"),
+        State("locations-query", "data"),
+        State("locations-viewport", "data"),
+        prevent_initial_call=True
+    )
+    def filter_locations(building, floor, accessible, name, sort, rendered_query, viewport):
+        query = location_query(building, floor, accessible, name, sort)
+        if query == rendered_query:
+            raise PreventUpdate
+
+        stamp, store = location_store()
+        virtual = viewport is not None
+
+        return locations_table(store, query, virtual), stamp, query, {"start": 0} if virtual else None
+
+    # Scrolls the virtual table back to the top when the store is reset
+    # (assets/virtual_scroll.js)
+    app.clientside_callback(
+        ClientsideFunction("virtual_scroll", "reset"),
+        Input("locations-viewport", "data"),
+        State("locations-viewport", "id"),
+        prevent_initial_call=True
+    )
+
+    # ------------------ VIRTUAL WINDOW ------------------
+    # Sends the rows of the window scrolled to, and again whenever the data
+    # changed (locations-rendered moved); only used by the virtual table
+    @app.callback(
+        Output("locations-window", "children"),
+        Output("locations-window-table", "style"),
+        Output("locations-spacer", "style"),
+        Input("locations-viewport", "data"),
+        Input("locations-rendered", "data"),
+        State("locations-query", "data"),
+        prevent_initial_call=True
+    )
+    def show_locations_window(viewport, _, query):
+        if viewport is None:
+            raise PreventUpdate
+
+        _, store = location_store()
+        query = query or {}
+        start = viewport.get("start")
+
+        return _render_cache.get(
+            store.version, ("window", start, tuple(sorted(query.items()))),
+            lambda: locations_window(store, start, store.select(**query))
+        )
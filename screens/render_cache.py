@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict
+
+# Renders kept per table, most recently used last
+RENDER_CACHE_SIZE = 32
+
+
+class RenderCache:
+    """Bounded LRU of the rendered tables of one dataset.
+
+    Renders are looked up by the dataset version they were made from plus
+    whatever else they depend on (filter or search text, role, page), so a
+    read-only visit to a screen costs a dictionary lookup. The first lookup
+    for a newer version (any save bumps it) drops every entry of the old
+    one. Cached renders are shared between requests and must not be
+    modified in place.
+    """
+
+    def __init__(self, size=RENDER_CACHE_SIZE):
+        self.size = size
+        self.version = None
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, version, key, render):
+        """The render for (version, key), calling render() to make it on a miss."""
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self.entries.clear()
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+
+        value = render()
+
+        with self._lock:
+            if self.version == version:
+                self.entries[key] = value
+                while len(self.entries) > self.size:
+                    self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self.version = None
+            self.entries.clear()
@@ -1,4 +1,3 @@
-import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from dash import html, dcc
@@ -6,10 +5,11 @@ import dash_bootstrap_components as dbc
 import random
 import numpy as np
 
-# Load locations data
+from screens import repository
+
+# Load locations data (a copy, the report adds its own columns)
 def load_locations():
-    df = pd.read_csv("data/locations.csv")
-    return df
+    return repository.locations.frame().copy()
 
 def reports_layout():
     df = load_locations()
@@ -0,0 +1,1105 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    SNAPSHOT_FORMAT = "feather"
+except ImportError:  # pyarrow is optional; snapshots fall back to pickle
+    pa = feather = None
+    SNAPSHOT_FORMAT = "pickle"
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DATA_DIR = "data"
+os.makedirs(DATA_DIR, exist_ok=True)
+
+# Where tables are stored: "csv" keeps one file per table in DATA_DIR,
+# "sqlite" keeps them all in DATABASE (filled from the CSV files on first use)
+STORAGE = "csv"
+DATABASE = os.path.join(DATA_DIR, "campus.db")
+
+# Append-only CSV tables are compacted (rewritten without superseded lines)
+# once they carry this many
+COMPACT_AFTER = 1000
+
+# Write-ahead journal for plain CSV tables: each write is appended to a
+# .journal file next to the CSV and fsynced together with the writes that
+# arrive within GROUP_COMMIT_WINDOW seconds; a background thread folds the
+# journal into the CSV after CHECKPOINT_AFTER records or CHECKPOINT_INTERVAL
+# seconds, and loading replays whatever was not folded in yet
+USE_JOURNAL = True
+GROUP_COMMIT_WINDOW = 0.002
+CHECKPOINT_AFTER = 500
+CHECKPOINT_INTERVAL = 5.0
+
+# Each CSV table keeps a typed columnar snapshot next to it (feather when
+# pyarrow is installed, pickle otherwise), rewritten on every save and used
+# instead of parsing the CSV while the CSV is unchanged since the snapshot
+# was taken (the snapshot records the CSV's mtime and size)
+USE_SNAPSHOTS = True
+
+# New ids come from a sequences.json file next to the table's CSV file;
+# each process reserves SEQUENCE_BLOCK ids at a time under a file lock, so
+# workers never hand out the same id and most inserts touch no file at all
+# (ids left in a block when the process exits are skipped)
+SEQUENCE_BLOCK = 50
+
+# Tables only re-check their storage (for edits made outside the app)
+# at most this often, in seconds
+CHECK_INTERVAL = 1.0
+
+
+def file_key(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+# Spellings read as booleans; anything else is missing (<NA>)
+BOOLEANS = {"true": True, "false": False, "1": True, "0": False, "yes": True, "no": False}
+
+
+def plain(value):
+    """numpy scalars / NA as the Python values sqlite3 accepts."""
+    if value is None or value is pd.NA or (isinstance(value, float) and value != value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+def temp_path(path):
+    """A new temporary file next to path, to write and then os.replace() over it.
+
+    Each writer (process or thread) gets its own file, so concurrent writers
+    never write into each other's temporary file.
+    """
+    fd, tmp = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    return tmp
+
+
+# path -> [RLock, holds, open file] of the file locks this process takes
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+
+@contextmanager
+def locked(path):
+    """Hold an exclusive lock on path (created if missing) across processes and threads.
+
+    The thread holding it can take it again, e.g. a table write that reloads
+    the table under the lock its backend also takes.
+    """
+    with _file_locks_guard:
+        entry = _file_locks.setdefault(os.path.abspath(path), [threading.RLock(), 0, None])
+    with entry[0]:
+        if not entry[1]:
+            f = open(path, "a+")
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            entry[2] = f
+        entry[1] += 1
+        try:
+            yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                f, entry[2] = entry[2], None
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+                f.close()
+
+
+# ---------------- Snapshots ----------------
+def snapshot_path(path):
+    return f"{os.path.splitext(path)[0]}.{'feather' if SNAPSHOT_FORMAT == 'feather' else 'pkl'}"
+
+
+def read_snapshot(path):
+    """(key of the CSV file it was taken from, frame, the backend's info()), or (None, None, None)."""
+    try:
+        if SNAPSHOT_FORMAT == "feather":
+            table = feather.read_table(path)
+            metadata = table.schema.metadata
+            key = json.loads(metadata[b"source_key"])
+            return tuple(key), table.to_pandas(), json.loads(metadata.get(b"info", b"{}"))
+        key, df, info = pd.read_pickle(path)
+        return tuple(key), df, info
+    except Exception:  # missing, unreadable, or written in another format
+        return None, None, None
+
+
+def write_snapshot(df, path, source_key, info=None):
+    tmp = temp_path(path)
+    try:
+        if SNAPSHOT_FORMAT == "feather":
+            table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+            metadata = {
+                **(table.schema.metadata or {}),
+                b"source_key": json.dumps(source_key).encode(),
+                b"info": json.dumps(info or {}).encode(),
+            }
+            feather.write_feather(table.replace_schema_metadata(metadata), tmp)
+        else:
+            pd.to_pickle((source_key, df, info or {}), tmp)
+        os.replace(tmp, path)
+    except Exception:  # e.g. mixed-type columns feather cannot store
+        for stale in (tmp, path):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+
+# ---------------- CSV Backend ----------------
+class CsvBackend:
+    """A table stored as one CSV file; every write rewrites the file."""
+
+    indexed = False
+
+    def __init__(self, path):
+        self.path = path
+        self.snapshot = snapshot_path(path) if USE_SNAPSHOTS else None
+
+    def key(self):
+        return file_key(self.path)
+
+    def data_key(self):
+        return [file_key(self.path)]
+
+    def load(self, table):
+        """Typed rows, from the snapshot when the CSV file has not changed since it was taken."""
+        csv_key = file_key(self.path)
+        if csv_key is None:
+            return None
+
+        if self.snapshot:
+            snapshot_key, df, info = read_snapshot(self.snapshot)
+            if snapshot_key == csv_key:
+                self.restore(info)
+                return df
+
+        df = self.parse(table)
+        if not table.strings:
+            df = table.typed(df)
+        if self.snapshot:
+            write_snapshot(df, self.snapshot, csv_key, self.info())
+        return df
+
+    def info(self):
+        """State parse() derives besides the rows, kept with the snapshot."""
+        return {}
+
+    def restore(self, info):
+        """Take back info() from a snapshot used instead of parsing."""
+
+    def parse(self, table):
+        if table.strings:
+            return pd.read_csv(self.path, dtype=str, keep_default_na=False)
+        try:
+            return pd.read_csv(self.path, dtype=table.schema)
+        except (ValueError, TypeError):  # a malformed value; typed() converts column by column
+            return pd.read_csv(self.path)
+
+    def save(self, df):
+        tmp = temp_path(self.path)
+        try:
+            with open(tmp, "w", newline="", encoding="utf-8") as f:
+                df.to_csv(f, index=False, float_format="%.15g")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        if self.snapshot:
+            write_snapshot(df, self.snapshot, file_key(self.path), self.info())
+
+    def sync(self, ticket):
+        pass
+
+    def insert(self, df, row):
+        self.save(df)
+
+    def update(self, df, row_id, values):
+        self.save(df)
+
+    def delete(self, df, row_id):
+        self.save(df)
+
+
+class AppendOnlyCsvBackend(CsvBackend):
+    """A CSV file that only grows between compactions.
+
+    Inserts and updates append the new version of the row; deletes append a
+    tombstone (the id with every other field empty). Loading keeps the last
+    version of each id in the position it was first written, and the file is
+    rewritten without the superseded lines once there are COMPACT_AFTER.
+    Appends and compactions hold the file's lock, and a compaction rewrites
+    what is in the file (other workers' lines included), not the caller's frame.
+    """
+
+    def __init__(self, path, columns):
+        super().__init__(path)
+        self.columns = columns
+        self.table = None
+        self.stale = 0
+
+    def load(self, table):
+        self.table = table
+        return super().load(table)
+
+    def parse(self, table):
+        df = super().parse(table)
+        first = df.id.drop_duplicates()
+        latest = df.drop_duplicates("id", keep="last").set_index("id").loc[first].reset_index()
+        rest = latest[self.columns[1:]]
+        removed = (rest == "").all(axis=1) if table.strings else rest.isna().all(axis=1)
+        latest = latest[~removed].reset_index(drop=True)
+        self.stale = len(df) - len(latest)
+        return latest
+
+    def info(self):
+        return {"stale": self.stale}
+
+    def restore(self, info):
+        self.stale = info.get("stale", 0)
+
+    def save(self, df):
+        self.stale = 0
+        super().save(df)
+
+    def _append(self, rows, stale):
+        with locked(f"{self.path}.lock"):
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            newline = True
+            if size:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    newline = f.read(1) == b"\n"
+
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                if not newline:
+                    f.write("\n")
+                rows.to_csv(f, header=not size, index=False, float_format="%.15g")
+
+            self.stale += stale
+            if self.stale >= COMPACT_AFTER:
+                current = self.parse(self.table)
+                self.save(current if self.table.strings else self.table.typed(current))
+
+    def insert(self, df, row):
+        self._append(pd.DataFrame([row], columns=self.columns), 0)
+
+    def update(self, df, row_id, values):
+        self._append(df[df.id == row_id], 1)
+
+    def delete(self, df, row_id):
+        self._append(pd.DataFrame([{"id": row_id}], columns=self.columns), 2)
+
+
+# ---------------- Journaled Backend ----------------
+def read_journal(path):
+    records = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:  # torn last line from a crash mid-write
+                    break
+                if record["op"] != "base":
+                    records.append(record)
+    return records
+
+
+def read_base(path):
+    """(base line, its length in bytes) a journal starts with, or (None, 0)."""
+    try:
+        with open(path, "rb") as f:
+            line = f.readline()
+        record = json.loads(line)
+    except (OSError, ValueError):
+        return None, 0
+    return (record, len(line)) if record.get("op") == "base" else (None, 0)
+
+
+def replay(df, records, columns):
+    """Apply journal records to df.
+
+    Only the rows the records touch are rebuilt: they keep their place (new
+    ids go at the end) and the other rows are taken over as they are.
+    Replaying records the frame already contains gives the same frame, so a
+    crash between a checkpoint and the journal truncation is harmless.
+    """
+    if df is None:
+        df = pd.DataFrame(columns=columns)
+    where = pd.Series(np.arange(len(df)), index=df.id.to_numpy())
+    where = where[~where.index.duplicated(keep="last")]
+
+    changed = {}  # id -> its row, or None once deleted, in the order first touched
+    for record in records:
+        if record["op"] == "insert":
+            changed[record["row"]["id"]] = {c: record["row"].get(c) for c in columns}
+        elif record["op"] == "update":
+            row_id = record["id"]
+            if row_id not in changed:
+                position = where.get(row_id)
+                changed[row_id] = None if position is None else df.iloc[position].to_dict()
+            if changed[row_id] is not None:
+                changed[row_id].update(record["values"])
+        elif record["op"] == "delete":
+            changed[record["id"]] = None
+    if not changed:
+        return df
+
+    at = where.reindex(list(changed)).to_numpy(dtype=float)
+    kept = np.ones(len(df), dtype=bool)
+    kept[at[~np.isnan(at)].astype(np.intp)] = False
+    kept = np.flatnonzero(kept)
+
+    places, rows = [], []
+    for place, row in zip(at, changed.values()):
+        if row is not None:
+            places.append(len(df) + len(rows) if np.isnan(place) else place)
+            rows.append(row)
+    if not rows:
+        return df.iloc[kept].reset_index(drop=True)
+
+    out = pd.concat([df.iloc[kept], pd.DataFrame(rows, columns=columns)], ignore_index=True)
+    order = np.argsort(np.concatenate([kept, places]), kind="stable")
+    return out.iloc[order].reset_index(drop=True)
+
+
+class JournaledBackend:
+    """Write-ahead journal with group commit in front of a CSV backend.
+
+    Writes only append a JSON line to the journal; a per-table thread writes
+    and fsyncs everything queued since its last batch in one go, and the
+    writers wait (outside the table lock) until their batch is durable. The
+    same thread checkpoints: it replays the journal on disk onto the CSV file
+    and empties the journal.
+
+    Every worker process appends to the same journal, so appends, checkpoints
+    and loads hold the table's file lock, and key() covers the journal as
+    well as the CSV file.
+
+    Emptying the journal starts it with a base line: the key the CSV file
+    has now and the table's position in its write history, counted in
+    journal bytes. data_key() adds the journal's records to that position,
+    so it is the same in every process and a checkpoint does not change it. Table writes hold the same lock, so while one is
+    in progress the thread cannot be halfway through a batch: loads take the
+    records still queued from memory instead of waiting for the thread, and
+    a full save makes them unnecessary.
+    """
+
+    indexed = False
+
+    def __init__(self, inner, journal_path):
+        self.inner = inner
+        self.path = inner.path
+        self.journal_path = journal_path
+        self.lock_path = f"{inner.path}.lock"
+        self.table = None
+        self.pending = []
+        self.enqueued = 0
+        self.durable = 0
+        self.unsaved = 0
+        self.unsaved_since = None
+        self.own_keys = {}
+        self.cond = threading.Condition()
+        self.io_lock = threading.Lock()
+        self.thread = None
+
+    def key(self):
+        # This process's own appends and checkpoints change the files without
+        # changing anything it has not loaded yet; io_lock keeps a read from
+        # landing between one of them and its own_keys entry
+        with self.io_lock:
+            return self._own_key()
+
+    def _own_key(self):
+        key = self._file_keys()
+        return self.own_keys.get(key, key)
+
+    def _file_keys(self):
+        return self.inner.key(), file_key(self.journal_path)
+
+    def data_key(self):
+        with locked(self.lock_path):
+            position = self._position()
+            if position is None:
+                return self.inner.data_key() + [file_key(self.journal_path)]
+            return [position]
+
+    def _position(self):
+        """The table's position per the journal's base line, or None when that
+        does not describe the CSV file (no base line yet, or an outside edit)."""
+        base, size = read_base(self.journal_path)
+        key = self.inner.key()
+        if base is None or base["csv"] != (list(key) if key else None):
+            return None
+        return base["position"] + os.path.getsize(self.journal_path) - size
+
+    @contextmanager
+    def _io(self):
+        """Hold the table's file lock and io_lock; the files' changes meanwhile are this process's own."""
+        with locked(self.lock_path), self.io_lock:
+            before = self._own_key()
+            yield
+            self.own_keys = {self._file_keys(): before}
+
+    def load(self, table):
+        self.table = table
+        with self._io():
+            records = read_journal(self.journal_path)
+            if len(records) >= CHECKPOINT_AFTER:  # e.g. left behind by a worker that exited
+                self._checkpoint(records)
+                records = []
+            with self.cond:
+                records += [json.loads(line) for line in self.pending]
+            df = self.inner.load(table)
+            return replay(df, records, table.columns) if records else df
+
+    def save(self, df):
+        # df already holds this process's queued records: they are dropped,
+        # and durable once the file is
+        with self._io():
+            position = self._position()
+            self.inner.save(df)
+            self._truncate(None if position is None else position + 1)
+            with self.cond:
+                self.pending = []
+                self.durable = self.enqueued
+                self.cond.notify_all()
+
+    def sync(self, ticket):
+        with self.cond:
+            while self.durable < ticket:
+                self.cond.wait()
+
+    def insert(self, df, row):
+        return self._log({"op": "insert", "row": row})
+
+    def update(self, df, row_id, values):
+        return self._log({"op": "update", "id": row_id, "values": values})
+
+    def delete(self, df, row_id):
+        return self._log({"op": "delete", "id": row_id})
+
+    def _log(self, record):
+        line = json.dumps(record, default=plain) + "\n"
+        with self.cond:
+            self.pending.append(line)
+            self.enqueued += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+            self.cond.notify_all()
+            return self.enqueued
+
+    def _checkpoint(self, records=None):
+        """Fold the journal on disk, other workers' records included, into the CSV file (_io() held)."""
+        if records is None:
+            records = read_journal(self.journal_path)
+        position = self._position()
+        if records:
+            df = replay(self.inner.load(self.table), records, self.table.columns)
+            self.inner.save(df if self.table.strings else self.table.typed(df))
+        self._truncate(position)
+
+    def _truncate(self, position):
+        """Empty the journal, leaving the base line for the CSV file at position (_io() held).
+
+        An unknown position (None) starts a new count from the clock, past any earlier one.
+        """
+        if position is None:
+            position = time.time_ns()
+        with open(self.journal_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "base", "csv": self.inner.key(), "position": position}) + "\n")
+        with self.cond:
+            self.unsaved = 0
+            self.unsaved_since = None
+
+    def _checkpoint_due(self):
+        if not self.unsaved:
+            return False
+        return (self.unsaved >= CHECKPOINT_AFTER
+                or time.monotonic() - self.unsaved_since >= CHECKPOINT_INTERVAL)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self._checkpoint_due():
+                    timeout = None
+                    if self.unsaved:
+                        timeout = self.unsaved_since + CHECKPOINT_INTERVAL - time.monotonic()
+                    self.cond.wait(timeout)
+
+            # Give concurrent writers a moment to join this batch
+            if GROUP_COMMIT_WINDOW:
+                time.sleep(GROUP_COMMIT_WINDOW)
+
+            with self._io():
+                with self.cond:
+                    batch, self.pending = self.pending, []
+                    upto = self.enqueued
+
+                if batch:
+                    with open(self.journal_path, "a", encoding="utf-8") as f:
+                        f.write("".join(batch))
+                        f.flush()
+                        os.fsync(f.fileno())
+
+                with self.cond:
+                    self.durable = upto
+                    self.unsaved += len(batch)
+                    if batch and self.unsaved_since is None:
+                        self.unsaved_since = time.monotonic()
+                    self.cond.notify_all()
+                    due = self._checkpoint_due()
+
+                if due:
+                    self._checkpoint()
+
+
+# ---------------- SQLite Backend ----------------
+def sql_type(dtype):
+    if dtype.startswith("Int") or dtype == "boolean":
+        return "INTEGER"
+    if dtype.startswith("Float"):
+        return "REAL"
+    return "TEXT"
+
+
+class SqliteBackend:
+    """A table stored in a SQLite database; writes touch only the changed row.
+
+    The table is created on first use with an index per entry in
+    table.indexes, and filled once from the table's CSV file if there is one.
+    """
+
+    indexed = True
+
+    def __init__(self, path, table):
+        self.path = path
+        self.name = table.name
+        self.columns = table.columns
+        self.created = False
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._create(table)
+
+    def _create(self, table):
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.name,)
+        ).fetchone()
+
+        columns = [f"{column} {sql_type(dtype)}" for column, dtype in table.schema.items()]
+        columns[table.columns.index("id")] += " PRIMARY KEY"
+
+        with self.conn:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {self.name} ({', '.join(columns)})")
+            for index in table.indexes:
+                self.conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {self.name}_{'_'.join(index)} ON {self.name} ({', '.join(index)})"
+                )
+
+        if not exists:
+            self.created = True
+            csv = table.csv_backend().load(table)
+            if csv is not None:
+                self.save(csv if table.strings else table.typed(csv))
+                self.created = False
+
+    def sync(self, ticket):
+        pass
+
+    def key(self):
+        # Bumped by commits from other connections (other processes, sqlite3 shell)
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def data_key(self):
+        return [file_key(self.path), file_key(f"{self.path}-wal")]
+
+    def load(self, table):
+        if self.created:
+            return None
+        df = pd.read_sql_query(f"SELECT {', '.join(self.columns)} FROM {self.name} ORDER BY rowid", self.conn)
+        return df.fillna("") if table.strings else df
+
+    def find(self, table, column, value):
+        row = self.conn.execute(
+            f"SELECT {', '.join(self.columns)} FROM {self.name} WHERE {column} = ? LIMIT 1", (plain(value),)
+        ).fetchone()
+        if row is None:
+            return None
+        return {c: table.coerce(c, v) for c, v in zip(self.columns, row)}
+
+    def save(self, df):
+        placeholders = ", ".join("?" for _ in self.columns)
+        rows = [tuple(plain(v) for v in row) for row in df[self.columns].itertuples(index=False)]
+        with self.conn:
+            self.conn.execute(f"DELETE FROM {self.name}")
+            self.conn.executemany(f"INSERT INTO {self.name} VALUES ({placeholders})", rows)
+        self.created = False
+
+    def insert(self, df, row):
+        columns = list(row)
+        with self.conn:
+            self.conn.execute(
+                f"INSERT INTO {self.name} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                [plain(row[c]) for c in columns]
+            )
+
+    def update(self, df, row_id, values):
+        columns = list(values)
+        with self.conn:
+            self.conn.execute(
+                f"UPDATE {self.name} SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?",
+                [plain(values[c]) for c in columns] + [plain(row_id)]
+            )
+
+    def delete(self, df, row_id):
+        with self.conn:
+            self.conn.execute(f"DELETE FROM {self.name} WHERE id = ?", (plain(row_id),))
+
+
+# ---------------- Id Sequences ----------------
+class Sequence:
+    """Increasing ids for one table, reserved in blocks from a shared file.
+
+    The file maps table names to the first id nobody has reserved yet and is
+    only read and rewritten under an exclusive lock, so each block belongs
+    to one process; ids within the block are then handed out from memory.
+    """
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.next = 0
+        self.end = 0
+        self.lock = threading.RLock()
+
+    def peek(self, floor=1, count=1):
+        """The id take() would return; never below floor."""
+        with self.lock:
+            self.next = max(self.next, floor)
+            if self.next + count > self.end:
+                self._reserve(count)
+            return self.next
+
+    def take(self, floor=1, count=1):
+        """The first of count consecutive new ids."""
+        with self.lock:
+            value = self.peek(floor, count)
+            self.next += count
+            return value
+
+    def _reserve(self, count=1):
+        with locked(f"{self.path}.lock"):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    reserved = json.load(f)
+            except (FileNotFoundError, ValueError):
+                reserved = {}
+            start = max(reserved.get(self.name, 1), self.next)
+            reserved[self.name] = start + max(count, SEQUENCE_BLOCK)
+
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(reserved, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        self.next, self.end = start, reserved[self.name]
+
+
+# ---------------- Table ----------------
+class Table:
+    """One dataset held in memory as a typed DataFrame over a storage backend.
+
+    frame() returns the cached frame, which is shared between callers and
+    must not be modified in place. Writes go through insert/update/delete/
+    replace: each builds a new frame, passes the change straight to the
+    backend and bumps version, so callers can tell cheaply whether anything
+    changed. Writes hold the table's file lock and reload first if another
+    process changed the table, so no worker writes over rows it has not seen.
+    """
+
+    def __init__(self, name, schema, defaults=None, indexes=(), csv_path=None,
+                 append_only=False, journal=False):
+        self.name = name
+        self.schema = schema
+        self.columns = list(schema)
+        self.bools = [column for column, dtype in schema.items() if dtype == "boolean"]
+        self.strings = all(dtype == "str" for dtype in schema.values())
+        self.defaults = defaults
+        self.indexes = list(indexes)
+        self.csv_path = csv_path or os.path.join(DATA_DIR, f"{name}.csv")
+        self.append_only = append_only
+        self.journal = journal
+        self.backend = self.csv_backend()
+        self.sequence = None
+        if not self.strings:
+            self.sequence = Sequence(name, os.path.join(os.path.dirname(self.csv_path), "sequences.json"))
+        self.version = 0
+        self._df = None
+        self._floor = None
+        self._key = None
+        self._checked = 0.0
+        self._seen_stamp = None
+        self._lock = threading.RLock()
+
+    @property
+    def path(self):
+        return self.backend.path
+
+    def at(self, path):
+        """The same table schema over another plain CSV file (benchmarks, imports)."""
+        return Table(self.name, self.schema, self.defaults, self.indexes,
+                     csv_path=path, append_only=self.append_only)
+
+    def csv_backend(self):
+        # Append-only files are already a log, so they are not journaled
+        if self.append_only:
+            return AppendOnlyCsvBackend(self.csv_path, self.columns)
+        if self.journal:
+            return JournaledBackend(CsvBackend(self.csv_path), f"{os.path.splitext(self.csv_path)[0]}.journal")
+        return CsvBackend(self.csv_path)
+
+    def use_backend(self, backend):
+        with self._lock:
+            self.backend = backend
+            self._df = None
+            self._floor = None
+
+    # ---------------- Read ----------------
+    def read(self):
+        """Load the stored rows into a typed frame, bypassing the cache."""
+        df = self.backend.load(self)
+        if df is None:
+            df = pd.DataFrame(self.defaults() if self.defaults else [], columns=self.columns)
+            if self.defaults:
+                self.backend.save(df)
+        if self.strings:
+            return df
+        return self.typed(df)
+
+    def typed(self, df):
+        """Convert df's columns to the schema dtypes, one vectorized pass per column."""
+        for column, dtype in self.schema.items():
+            values = df[column]
+            if dtype == "str" or str(values.dtype) == dtype:
+                continue
+            if dtype == "boolean":
+                if values.dtype != bool:
+                    values = values.astype(str).str.strip().str.lower().map(BOOLEANS)
+            elif dtype == "category":
+                values = values.where(values.isna(), values.astype(str))
+            else:
+                values = pd.to_numeric(values, errors="coerce")
+                if dtype.startswith("Int"):
+                    values = values.where(values % 1 == 0)
+            df[column] = values.astype(dtype)
+        return df
+
+    def coerce(self, column, value):
+        """One form / API value converted to its column's type.
+
+        Raises ValueError for a value that does not fit the column (rather
+        than storing it as missing).
+        """
+        dtype = self.schema[column]
+        if value is None or dtype == "str":
+            return value
+        if dtype == "boolean":
+            if isinstance(value, bool):
+                return value
+            if str(value).strip().lower() not in BOOLEANS:
+                raise ValueError(f"{column}: {value!r} is not a yes/no value")
+            return BOOLEANS[str(value).strip().lower()]
+        if dtype == "category":
+            return str(value)
+        number = pd.to_numeric(value, errors="coerce")
+        if pd.isna(number):
+            raise ValueError(f"{column}: {value!r} is not a number")
+        if dtype.startswith("Int"):
+            limits = np.iinfo(dtype.lower())
+            if not float(number).is_integer() or not limits.min <= number <= limits.max:
+                raise ValueError(f"{column}: {value!r} is not a whole number in range")
+            return int(number)
+        return float(number)
+
+    def with_categories(self, df, values):
+        """df with any new values added to its categorical columns' categories."""
+        added = {
+            column: df[column].cat.add_categories([value])
+            for column, value in values.items()
+            if isinstance(df[column].dtype, pd.CategoricalDtype)
+            and value is not None and value not in df[column].cat.categories
+        }
+        return df.assign(**added) if added else df
+
+    def memory_report(self):
+        df = self.frame()
+        usage = df.memory_usage(deep=True, index=False)
+        return {
+            "table": self.name,
+            "rows": len(df),
+            "bytes": int(usage.sum()),
+            "columns": {column: {"dtype": str(df[column].dtype), "bytes": int(usage[column])} for column in df.columns},
+        }
+
+    def snapshot(self):
+        """(version, frame), reloading if the stored table changed outside this process."""
+        now = time.monotonic()
+        with self._lock:
+            if self._df is None or now - self._checked >= CHECK_INTERVAL:
+                self._checked = now
+                key = self.backend.key()
+                if self._df is None or key != self._key:
+                    self._df = self.read()
+                    self._floor = None
+                    self._key = self.backend.key()
+                    self.version += 1
+            return self.version, self._df
+
+    def frame(self):
+        return self.snapshot()[1]
+
+    def storage_key(self):
+        """Where the stored table is in its write history; any write from any process changes it.
+
+        The stat of each file the table is stored in, except that a journaled
+        table counts its journal, so folding the journal into the CSV file
+        leaves it alone.
+        """
+        return self.backend.data_key()
+
+    def stamp(self):
+        """storage_key() as a short string, the same in every worker process."""
+        return "-".join(
+            f"{key:x}" if isinstance(key, int) else f"{key[0]:x}.{key[1]:x}" if key else "0"
+            for key in self.storage_key()
+        )
+
+    def stamped(self):
+        """(stamp, version, frame) where the frame is at least as new as the stamp.
+
+        The storage is re-checked right away (not only every CHECK_INTERVAL)
+        whenever the stamp moved since the last call, so a stamp shown next
+        to rendered rows never claims data the rows do not have. That takes
+        backend.key() to move with every write storage_key() sees, a
+        journal's appends included.
+        """
+        stamp = self.stamp()
+        with self._lock:
+            if stamp != self._seen_stamp:
+                self._checked = float("-inf")
+                self._seen_stamp = stamp
+            return (stamp, *self.snapshot())
+
+    def records(self):
+        return self.frame().to_dict("records")
+
+    def get(self, row_id):
+        return self.find("id", row_id)
+
+    def find(self, column, value):
+        """First row whose column equals value, as a dict, or None.
+
+        Indexed backends answer with one lookup; otherwise the cached frame is scanned.
+        """
+        df = self.frame()
+        if self.backend.indexed:
+            with self._lock:
+                return self.backend.find(self, column, value)
+        rows = df[df[column] == value]
+        return rows.iloc[0].to_dict() if not rows.empty else None
+
+    def floor(self):
+        """One more than the largest id in the table (scanned once per load)."""
+        with self._lock:
+            df = self.frame()
+            if self._floor is None:
+                self._floor = int(df.id.max()) + 1 if not df.empty else 1
+            return self._floor
+
+    # ---------------- Write ----------------
+    def insert(self, row):
+        """Append one row, numbering it when it has no id; returns the saved row."""
+        with self._writing():
+            row = {column: self.coerce(column, value) for column, value in row.items()}
+            if row.get("id") is None:
+                row["id"] = self.sequence.take(self.floor()) if self.sequence else self.floor()
+            if not self.strings:
+                self._floor = max(self.floor(), int(row["id"]) + 1)
+            df = self.frame()
+            if df.empty:
+                df = self.typed(pd.DataFrame([row], columns=self.columns))
+            else:
+                df = self.with_categories(df, row)
+                new = pd.DataFrame({c: pd.array([row.get(c)], dtype=df[c].dtype) for c in self.columns})
+                df = pd.concat([df, new], ignore_index=True)
+            ticket = self.backend.insert(df, row)
+            self._committed(df)
+        self.backend.sync(ticket)
+        return row
+
+    def insert_many(self, df, replace=False):
+        """Append df's rows in one write, numbered with new consecutive ids (any id column is ignored).
+
+        With replace the table's current rows are dropped in the same write.
+        Returns the saved rows.
+        """
+        with self._writing():
+            rows = df.reindex(columns=self.columns[1:]).reset_index(drop=True)
+            first = self.sequence.take(self.floor(), len(rows)) if self.sequence else self.floor()
+            rows.insert(0, "id", range(first, first + len(rows)))
+            current = self.frame().iloc[:0] if replace else self.frame()
+            df = pd.concat([current, rows], ignore_index=True) if not current.empty else rows
+            if not self.strings:
+                df = self.typed(df)
+            self.backend.save(df)
+            self._committed(df)
+            self._floor = first + len(rows)
+            return df.iloc[len(current):]
+
+    def update(self, row_id, values):
+        with self._writing():
+            values = {column: self.coerce(column, value) for column, value in values.items()}
+            df = self.with_categories(self.frame(), values)
+            match = df.id == row_id
+            df = df.copy()
+            for column, value in values.items():
+                df[column] = df[column].where(~match, value)
+            ticket = self.backend.update(df, row_id, values)
+            self._committed(df)
+        self.backend.sync(ticket)
+
+    def delete(self, row_id):
+        with self._writing():
+            df = self.frame()
+            df = df[df.id != row_id].reset_index(drop=True)
+            ticket = self.backend.delete(df, row_id)
+            self._committed(df)
+        self.backend.sync(ticket)
+
+    def replace(self, df):
+        with self._writing():
+            df = df[self.columns].copy()
+            if not self.strings:
+                df = self.typed(df)
+            self.backend.save(df)
+            self._committed(df)
+
+    @contextmanager
+    def _writing(self):
+        """Hold the table for a write, reloaded if the stored table changed since it was read."""
+        with self._lock, locked(f"{self.backend.path}.lock"):
+            self._checked = float("-inf")
+            self.snapshot()
+            yield
+
+    def _committed(self, df):
+        self._df = df
+        self._key = self.backend.key()
+        self._checked = time.monotonic()
+        self.version += 1
+
+
+# ---------------- Tables ----------------
+def default_users():
+    return [{
+        "id": str(uuid.uuid4()),
+        "username": "admin",
+        "password": "1234",
+        "full_name": "Admin User",
+        "email": "admin@test.com",
+        "role": "admin",
+        "status": "active",
+    }]
+
+
+routes = Table(
+    "routes",
+    {
+        "id": "Int32",
+        "start_location": "category",
+        "end_location": "category",
+        "distance_m": "Float64",
+        "accessible": "boolean",
+    },
+    indexes=[("start_location", "end_location")],
+    journal=USE_JOURNAL
+)
+locations = Table(
+    "locations",
+    {"id": "Int32", "name": "str", "building": "category", "floor": "Int16", "accessible": "boolean"},
+    indexes=[("name",)],
+    journal=USE_JOURNAL
+)
+notifications = Table(
+    "notifications",
+    {"id": "Int32", "user_id": "Int32", "message": "str", "delivered": "boolean"},
+    indexes=[("user_id",)],
+    csv_path=os.path.join(DATA_DIR, "notification.csv"),
+    append_only=True
+)
+users = Table(
+    "users",
+    {column: "str" for column in ["id", "username", "password", "full_name", "email", "role", "status"]},
+    defaults=default_users,
+    indexes=[("username",)],
+    journal=USE_JOURNAL
+)
+
+TABLES = {table.name: table for table in (routes, locations, notifications, users)}
+
+
+def use_storage(storage, database=DATABASE):
+    """Point every table at "csv" files or a "sqlite" database."""
+    for table in TABLES.values():
+        if storage == "sqlite":
+            table.use_backend(SqliteBackend(database, table))
+        else:
+            table.use_backend(table.csv_backend())
+
+
+def data_versions():
+    """Every table's stamp(), for clients to tell whether what they show is current."""
+    return {name: table.stamp() for name, table in TABLES.items()}
+
+
+def memory_report():
+    return [table.memory_report() for table in TABLES.values()]
+
+
+if STORAGE != "csv":
+    use_storage(STORAGE)
+
+
+if __name__ == "__main__":
+    for report in memory_report():
+        print(f"{report['table']}: {report['rows']} rows, {report['bytes'] / 1024:.1f} KiB")
+        for column, info in report["columns"].items():
+            print(f"  {column:16} {info['dtype']:28} {info['bytes'] / 1024:10.1f} KiB")
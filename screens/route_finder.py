@@ -1,35 +1,254 @@
 import os
+import threading
+import time
+from collections import OrderedDict
 import dash
 from dash import html, dcc, Input, Output, State, callback
-import pandas as pd
 import dash_bootstrap_components as dbc
 
+from screens import repository
+from screens.route_graph import RouteGraph, format_distance, path_key
+from screens.search_index import NameSearchIndex
+from screens.distance_table import BackgroundDistanceTable
+
 BLUE = "#0B63C5"
 GREEN = "#28a745"
 RED = "#dc3545"
 
-ROUTES_CSV = "data/routes.csv"
+# The graph is rebuilt only when the routes table version changes, or by
+# routes_changed() when route_manager reports its own write. Building/floor
+# metadata from the locations table is joined into the graph at build time
+# and re-joined when that table changes.
+_routes_cache = {"version": None, "locations_version": None, "df": None, "graph": None}
+_routes_lock = threading.Lock()
+
+# Workers share one route graph file instead of each loading the routes
+# table and building the graph: whoever rebuilds it writes the RouteGraph
+# blob to ROUTE_STORE atomically, and every process maps the file read-only
+# (zero-copy arrays over the same pages). The blob is stamped with the
+# routes/locations tables' stamp() and rebuilt, by one worker at a time
+# under ROUTE_STORE_LOCK, when they change.
+USE_ROUTE_STORE = True
+ROUTE_STORE = os.path.join(repository.DATA_DIR, "routes.graph")
+ROUTE_STORE_LOCK = f"{ROUTE_STORE}.lock"
+_store_cache = {"graph": None, "store_key": None, "checked": 0.0}
+
+# Alternative routes (Yen's K shortest paths): K is capped at MAX_ALTERNATIVES,
+# each query gets ALTERNATIVES_TIME_BUDGET seconds, and complete answers are
+# cached per (start, end, K, accessible) until the route graph changes
+MAX_ALTERNATIVES = 10
+ALTERNATIVES_TIME_BUDGET = 0.05
+ALTERNATIVES_CACHE_SIZE = 256
+_alternatives_cache = {"graph": None, "paths": OrderedDict()}
+
+# Goal-directed A* search (building/floor heuristic) for single-pair queries
+USE_ASTAR = True
+
+# Precomputed all-pairs distance tables (full graph and accessible-only subgraph);
+# queries fall back to Dijkstra while a table (re)builds
+USE_DISTANCE_TABLE = True
+distance_tables = {
+    False: BackgroundDistanceTable(),
+    True: BackgroundDistanceTable(accessible_only=True),
+}
+
+# The From/To dropdowns search location names on the server: each keystroke
+# returns at most LOCATION_OPTIONS matches from an index rebuilt per graph
+LOCATION_OPTIONS = 20
+_search_cache = {"graph": None, "index": None}
+_layout_cache = {"graph": None, "layout": None}
 
 # ---------------- Load Routes ----------------
-def load_routes():
-    if os.path.exists(ROUTES_CSV):
-        df = pd.read_csv(ROUTES_CSV)
+def build_graph(df, locations):
+    graph = RouteGraph(df)
+    graph.attach_locations(locations)
+    return graph
+
+
+def cached_routes():
+    """Return the cached (routes frame, route graph), rebuilding only if the routes table changed.
+
+    The frame is shared between callers and must not be modified in place.
+    """
+    version, df = repository.routes.snapshot()
+    locations_version, locations = repository.locations.snapshot()
+    with _routes_lock:
+        cache = _routes_cache
+        if cache["version"] == version:
+            if cache["locations_version"] != locations_version:
+                cache["graph"].attach_locations(locations)
+                cache["locations_version"] = locations_version
+            return cache["df"], cache["graph"]
+
+        graph = build_graph(df, locations)
+        cache.update(version=version, locations_version=locations_version, df=df, graph=graph)
+
+    if USE_DISTANCE_TABLE:
+        for distance_table in distance_tables.values():
+            distance_table.rebuild(graph)
+
+    return df, graph
+
+
+def get_route_graph():
+    return stored_graph() if USE_ROUTE_STORE else cached_routes()[1]
+
+
+def store_stamp():
+    return [repository.routes.stamp(), repository.locations.stamp()]
+
+
+def stamped_graph():
+    """(routes version, locations version, routes frame, graph) of the current tables.
+
+    graph.stamp is taken before the tables are read, so the graph is never
+    older than its stamp claims.
+    """
+    routes_stamp, version, df = repository.routes.stamped()
+    locations_stamp, locations_version, locations = repository.locations.stamped()
+    graph = build_graph(df, locations)
+    graph.stamp = [routes_stamp, locations_stamp]
+    return version, locations_version, df, graph
+
+
+def load_store():
+    """The graph mapped from ROUTE_STORE, or None."""
+    try:
+        return RouteGraph.load(ROUTE_STORE)
+    except (OSError, ValueError):  # missing, unreadable or written in an older format
+        return None
+
+
+def save_store(graph):
+    """Write the graph to ROUTE_STORE if it is still current (ROUTE_STORE_LOCK held)."""
+    if graph.stamp != store_stamp():
+        return
+    try:
+        graph.save(ROUTE_STORE, graph.stamp)
+    except OSError:  # e.g. the file is mapped by another process on Windows; the store is only a cache
+        pass
+
+
+def stored_graph():
+    """The route graph mapped from ROUTE_STORE, rebuilding the file when its stamp is out of date."""
+    now = time.monotonic()
+    with _routes_lock:
+        cache = _store_cache
+        if cache["graph"] is not None and now - cache["checked"] < repository.CHECK_INTERVAL:
+            return cache["graph"]
+        cache["checked"] = now
+
+        stamp = store_stamp()
+        store_key = repository.file_key(ROUTE_STORE)
+        if cache["graph"] is not None and cache["store_key"] == store_key and cache["graph"].stamp == stamp:
+            return cache["graph"]
+
+        graph = load_store() if store_key is not None else None
+        if graph is None or graph.stamp != stamp:
+            # One worker rebuilds; the others wait and then map its file
+            with repository.locked(ROUTE_STORE_LOCK):
+                graph = load_store()
+                if graph is None or graph.stamp != store_stamp():
+                    graph = stamped_graph()[-1]
+                    save_store(graph)
+                store_key = repository.file_key(ROUTE_STORE)
+
+        changed = graph is not cache["graph"]
+        cache.update(graph=graph, store_key=store_key)
+
+    if changed and USE_DISTANCE_TABLE:
+        for distance_table in distance_tables.values():
+            distance_table.rebuild(graph)
+
+    return graph
+
+def location_search_index():
+    graph = get_route_graph()
+    with _routes_lock:
+        if _search_cache["graph"] is not graph:
+            _search_cache.update(graph=graph, index=NameSearchIndex(graph.locations))
+        return _search_cache["index"]
 
-        df["distance_m"] = pd.to_numeric(df["distance_m"], errors="coerce")
-        df["accessible"] = df["accessible"].astype(str).str.lower() == "true"
 
-        return df
+def location_options(search_value=None, selected=None):
+    names = location_search_index().search(search_value, LOCATION_OPTIONS)
+    if selected and selected not in names:
+        names = [selected] + names
+    return [{"label": l, "value": l} for l in names]
 
-    return pd.DataFrame(columns=[
-        "id", "start_location", "end_location", "distance_m", "accessible"
-    ])
+# ---------------- Shortest Route ----------------
+def shortest_route(graph, start, end, accessible_only=False):
+    if USE_DISTANCE_TABLE:
+        table = distance_tables[accessible_only].get()
+        if table is not None and start in table and end in table:
+            path = table.path(start, end)
+            if path is not None or table.distance(start, end) is None:
+                return path
+
+    return graph.shortest_path(start, end, accessible_only, astar=USE_ASTAR)
+
+
+def alternative_routes(graph, start, end, k, accessible_only=False):
+    key = (start, end, k, accessible_only)
+    with _routes_lock:
+        if _alternatives_cache["graph"] is not graph:
+            _alternatives_cache.update(graph=graph, paths=OrderedDict())
+        cache = _alternatives_cache["paths"]
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+    paths, complete = graph.k_shortest_paths(
+        start, end, k, accessible_only, time_budget=ALTERNATIVES_TIME_BUDGET, astar=USE_ASTAR
+    )
+
+    if complete:
+        with _routes_lock:
+            if _alternatives_cache["graph"] is graph:
+                cache[key] = paths
+                while len(cache) > ALTERNATIVES_CACHE_SIZE:
+                    cache.popitem(last=False)
+
+    return paths
+
+
+def routes_changed(pairs=None):
+    """Called after route_manager writes the routes table.
+
+    pairs are the (start, end) locations whose routes changed, letting the
+    distance tables repair instead of rebuild.
+    """
+    version, locations_version, df, graph = stamped_graph()
+    with _routes_lock:
+        _routes_cache.update(version=version, locations_version=locations_version, df=df, graph=graph)
+        if USE_ROUTE_STORE:
+            with repository.locked(ROUTE_STORE_LOCK):
+                save_store(graph)
+                _store_cache.update(graph=graph, store_key=repository.file_key(ROUTE_STORE), checked=time.monotonic())
+
+    if USE_DISTANCE_TABLE:
+        for distance_table in distance_tables.values():
+            if pairs is None:
+                distance_table.rebuild(graph)
+            else:
+                distance_table.routes_changed(graph, pairs)
 
 # ---------------- Layout ----------------
 def layout():
-    df = load_routes()
-    locations = sorted(
-        set(df["start_location"].tolist() + df["end_location"].tolist())
-    ) if not df.empty else []
+    """The page, rebuilt only when the route graph changed (its dropdown options come from the graph)."""
+    graph = get_route_graph()
+    with _routes_lock:
+        if _layout_cache["graph"] is graph:
+            return _layout_cache["layout"]
+
+    page = build_layout()
+    with _routes_lock:
+        _layout_cache.update(graph=graph, layout=page)
+    return page
+
+
+def build_layout():
+    options = location_options()
 
     return dbc.Container([
 
@@ -43,7 +262,7 @@ def layout():
                         html.Label("From", className="form-label fw-semibold"),
                         dcc.Dropdown(
                             id="start-location",
-                            options=[{"label": l, "value": l} for l in locations],
+                            options=options,
                             placeholder="Select start location",
                             className="mb-3"
                         )
@@ -53,12 +272,37 @@ def layout():
                         html.Label("To", className="form-label fw-semibold"),
                         dcc.Dropdown(
                             id="end-location",
-                            options=[{"label": l, "value": l} for l in locations],
+                            options=options,
                             placeholder="Select end location",
                             className="mb-3"
                         )
                     ], md=6),
-                ], className="mb-4"),
+                ], className="mb-3"),
+
+                dbc.Row([
+                    dbc.Col(
+                        dbc.Checklist(
+                            id="accessible-only",
+                            options=[{"label": "Accessible routes only", "value": True}],
+                            value=[],
+                            switch=True
+                        ),
+                        md=6
+                    ),
+                    dbc.Col([
+                        html.Label("Routes to show", className="form-label fw-semibold me-2"),
+                        dcc.Input(
+                            id="route-alternatives",
+                            type="number",
+                            min=1,
+                            max=MAX_ALTERNATIVES,
+                            step=1,
+                            value=3,
+                            className="form-control d-inline-block",
+                            style={"maxWidth": "100px"}
+                        )
+                    ], md=6),
+                ], className="mb-4 align-items-center"),
 
                 dbc.Button(
                     "Find Distance",
@@ -76,43 +320,103 @@ def layout():
 
 # ---------------- Find Route Callback ----------------
 def register_find_routes_callbacks(app):
+    for dropdown in ("start-location", "end-location"):
+        @app.callback(
+            Output(dropdown, "options"),
+            Input(dropdown, "search_value"),
+            State(dropdown, "value"),
+            prevent_initial_call=True
+        )
+        def search_locations(search_value, selected):
+            if search_value is None:
+                return dash.no_update
+            return location_options(search_value, selected)
+
     @app.callback(
         Output("route-result", "children"),
         Input("find-btn", "n_clicks"),
         State("start-location", "value"),
         State("end-location", "value"),
+        State("accessible-only", "value"),
+        State("route-alternatives", "value"),
         prevent_initial_call=True
     )
-    def find_route(n_clicks, start, end):
+    def find_route(n_clicks, start, end, accessible_only, k):
         if not start or not end:
             return html.P(
                 "Please select both locations",
                 className="text-danger fw-bold"
             )
 
-        df = load_routes()
+        graph = get_route_graph()
+        accessible_only = bool(accessible_only)
+        route = shortest_route(graph, start, end, accessible_only)
 
-        # Allow both directions and find the shortest route
-        route = df[
-            ((df["start_location"] == start) & (df["end_location"] == end)) |
-            ((df["start_location"] == end) & (df["end_location"] == start))
-        ]
-
-        if route.empty:
+        if route is None:
             return html.P(
-                f"No route found between {start} and {end}",
+                f"No {'accessible ' if accessible_only else ''}route found between {start} and {end}",
                 className="text-danger fw-bold"
             )
 
-        # Find the route with minimum distance
-        shortest_route = route.loc[route["distance_m"].idxmin()]
+        k = min(max(int(k or 1), 1), MAX_ALTERNATIVES)
+        alternatives = []
+        if k > 1:
+            best = path_key(route["legs"])
+            alternatives = [
+                p for p in alternative_routes(graph, start, end, k, accessible_only)
+                if path_key(p["legs"]) != best
+            ][:k - 1]
+
+        return html.Div([
+            dbc.Alert([
+                html.H5(f"Shortest {'Accessible ' if accessible_only else ''}Route Found", className="mb-3"),
+                html.P(f"Route: {' → '.join(route['path'])}", className="mb-2"),
+                html.P(f"Distance: {format_distance(route['distance_m'])} meters", className="mb-2 fw-semibold"),
+                html.P(
+                    f"Accessible: {'Yes' if route['accessible'] else 'No'}",
+                    style={"color": GREEN if route["accessible"] else RED, "fontWeight": "500"}
+                ),
+                route_legs(route)
+            ], color="success", className="mt-2 shadow-sm"),
+            alternative_routes_list(alternatives)
+        ])
+
+
+# ---------------- Route Legs ----------------
+def route_legs(route):
+    if len(route["legs"]) < 2:
+        return html.Div()
+
+    return html.Ol([
+        html.Li(
+            f"{leg['from']} → {leg['to']}: {format_distance(leg['distance_m'])} m"
+            f"{'' if leg['accessible'] else ' (not accessible)'}"
+        )
+        for leg in route["legs"]
+    ], className="mb-0 small")
+
+
+# ---------------- Alternative Routes ----------------
+def alternative_routes_list(routes):
+    if not routes:
+        return html.Div()
+
+    return dbc.Card([
+        dbc.CardHeader("Alternative Routes", className="fw-semibold"),
+        dbc.ListGroup([
+            dbc.ListGroupItem([
+                html.Div(f"{i}. {' → '.join(route['path'])}", className="fw-semibold"),
+                html.Small(
+                    f"{format_distance(route['distance_m'])} meters · "
+                    f"{'Accessible' if route['accessible'] else 'Not accessible'} · "
+                    f"via route {route_numbers(route)}",
+                    style={"color": GREEN if route["accessible"] else RED}
+                )
+            ])
+            for i, route in enumerate(routes, start=2)
+        ], flush=True)
+    ], className="mt-2 shadow-sm")
 
-        return dbc.Alert([
-            html.H5("Shortest Route Found", className="mb-3"),
-            html.P(f"Distance: {shortest_route['distance_m']} meters", className="mb-2 fw-semibold"),
-            html.P(
-                f"Accessible: {'Yes' if shortest_route['accessible'] else 'No'}",
-                style={"color": GREEN if shortest_route["accessible"] else RED, "fontWeight": "500"}
-            )
-        ], color="success", className="mt-2 shadow-sm")
 
+def route_numbers(route):
+    return ", ".join(f"#{leg['route_id']}" for leg in route["legs"])
@@ -0,0 +1,482 @@
+import heapq
+import json
+import math
+import mmap
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+BLOB_MAGIC = b"RGRAPH01"
+BLOB_ALIGN = 8
+BLOB_ARRAYS = ["offsets", "targets", "distances", "route_ids", "accessible_bits",
+               "accessible_slots", "accessible_offsets"]
+# attach_locations() results, stored as per-location arrays plus scalar costs
+META_ARRAYS = {"buildings": np.int64, "floors": np.float64, "x": np.float64, "y": np.float64}
+META_COSTS = ["building_cost", "floor_cost", "coord_scale"]
+
+
+# ---------------- Route Graph ----------------
+class RouteGraph:
+    """Compact, integer-coded index over routes.csv, built once and queried many times.
+
+    Location names are interned to ids (locations / location_index, ids in
+    sorted-name order). Routes are walkable in both directions, so each row
+    becomes two directed slots in CSR arrays: the slots leaving location u
+    are offsets[u]:offsets[u + 1], with targets, distances and route_ids
+    per slot and a packed accessible_bits mask. Parallel routes between
+    the same two locations are all kept; searches settle on the cheapest.
+    The accessible-only subgraph is a second CSR index (accessible_offsets /
+    accessible_slots) over the same slots, so step-free queries cost the
+    same as normal ones.
+    """
+
+    def __init__(self, df=None):
+        if df is None or df.empty:
+            self._set_arrays([], np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32),
+                             np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8))
+            return
+
+        start = df["start_location"].to_numpy(dtype=object)
+        end = df["end_location"].to_numpy(dtype=object)
+        distance = pd.to_numeric(df["distance_m"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        accessible = df["accessible"].fillna(False).to_numpy(dtype=bool)
+        route_id = pd.to_numeric(df["id"], errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+
+        valid = ~(pd.isna(start) | pd.isna(end) | np.isnan(distance)) & (distance >= 0)
+        start, end, distance = start[valid], end[valid], distance[valid]
+        accessible, route_id = accessible[valid], route_id[valid]
+
+        codes, names = pd.factorize(np.concatenate([start, end]), sort=True)
+        n_routes = len(start)
+        src = np.concatenate([codes[:n_routes], codes[n_routes:]])
+        dst = np.concatenate([codes[n_routes:], codes[:n_routes]])
+
+        order = np.argsort(src, kind="stable")
+        offsets = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(names)), out=offsets[1:])
+
+        self._set_arrays(
+            list(names),
+            offsets,
+            dst[order].astype(np.int32),
+            np.concatenate([distance, distance])[order],
+            np.concatenate([route_id, route_id])[order],
+            np.packbits(np.concatenate([accessible, accessible])[order]),
+        )
+
+    def _set_arrays(self, locations, offsets, targets, distances, route_ids, accessible_bits,
+                    accessible_slots=None, accessible_offsets=None):
+        self.locations = locations
+        self.location_index = {name: i for i, name in enumerate(locations)}
+        self.offsets = offsets
+        self.targets = targets
+        self.distances = distances
+        self.route_ids = route_ids
+        self.accessible_bits = accessible_bits
+        self.edge_count = len(targets) // 2
+        self.location_meta = None
+        self.stamp = None
+        self._sparse = {}
+        self._pairs = {}
+
+        # Accessible-only subgraph: per-location runs of slot numbers into the arrays above
+        if accessible_slots is None:
+            accessible = self.slot_accessible()
+            accessible_slots = np.flatnonzero(accessible)
+            accessible_offsets = np.concatenate([[0], np.cumsum(accessible)])[offsets]
+        self.accessible_slots = accessible_slots
+        self.accessible_offsets = accessible_offsets
+
+    def __contains__(self, location):
+        return location in self.location_index
+
+    def slot_accessible(self):
+        return np.unpackbits(self.accessible_bits, count=len(self.targets)).astype(bool)
+
+    def _is_accessible(self, slot):
+        return bool((self.accessible_bits[slot >> 3] >> (7 - (slot & 7))) & 1)
+
+    def _route_id(self, slot):
+        route_id = int(self.route_ids[slot])
+        return None if route_id < 0 else route_id
+
+    def _slots(self, node, accessible_only=False):
+        if accessible_only:
+            return self.accessible_slots[self.accessible_offsets[node]:self.accessible_offsets[node + 1]]
+        return np.arange(self.offsets[node], self.offsets[node + 1])
+
+    def edges_from(self, location, accessible_only=False):
+        """Routes leaving a location as (neighbour, distance, accessible, route_id) tuples."""
+        if location not in self.location_index:
+            return []
+        return [
+            (self.locations[self.targets[slot]], float(self.distances[slot]),
+             self._is_accessible(slot), self._route_id(slot))
+            for slot in self._slots(self.location_index[location], accessible_only).tolist()
+        ]
+
+    def best_edge(self, start, end, accessible_only=False):
+        """Cheapest direct route between two locations as (distance, accessible, route_id)."""
+        if start not in self.location_index or end not in self.location_index:
+            return None
+
+        slots = self._slots(self.location_index[start], accessible_only)
+        slots = slots[self.targets[slots] == self.location_index[end]]
+        if not len(slots):
+            return None
+        slot = int(slots[np.argmin(self.distances[slots])])
+        return float(self.distances[slot]), self._is_accessible(slot), self._route_id(slot)
+
+    def pair_edges(self, accessible_only=False):
+        """Cheapest slot per directed location pair, as (rows, cols, slots) arrays."""
+        if accessible_only not in self._pairs:
+            n = len(self.locations)
+            offsets = self.accessible_offsets if accessible_only else self.offsets
+            slots = self.accessible_slots if accessible_only else np.arange(len(self.targets))
+            rows = np.repeat(np.arange(n), np.diff(offsets))
+            cols = self.targets[slots].astype(np.int64)
+
+            keys = rows * n + cols
+            order = np.lexsort((self.distances[slots], keys))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = keys[order][1:] != keys[order][:-1]
+            order = order[first]
+            self._pairs[accessible_only] = rows[order], cols[order], slots[order]
+        return self._pairs[accessible_only]
+
+    def sparse_matrix(self, accessible_only=False):
+        """Symmetric scipy CSR matrix of the cheapest route per pair, indexed like self.locations."""
+        if accessible_only not in self._sparse:
+            from scipy.sparse import csr_matrix
+
+            n = len(self.locations)
+            rows, cols, slots = self.pair_edges(accessible_only)
+            self._sparse[accessible_only] = csr_matrix((self.distances[slots], (rows, cols)), shape=(n, n))
+        return self._sparse[accessible_only]
+
+    # ---------------- Location Metadata ----------------
+    def attach_locations(self, locations_df):
+        """Join building/floor (and optional x/y coordinates) from locations.csv for A* search.
+
+        The A* heuristic is a lower bound calibrated on the routes themselves:
+        leaving a building costs at least the cheapest route not known to stay
+        inside one, each floor changed costs at least the cheapest
+        metres-per-floor of any route, and straight-line distance is scaled by
+        the smallest route-length/coordinate-distance ratio. Floors and
+        coordinates are only used when every location has them.
+        """
+        n = len(self.locations)
+        if locations_df is None or locations_df.empty or not n or "name" not in locations_df:
+            self.location_meta = None
+            return
+
+        meta = locations_df.drop_duplicates("name", keep="last").set_index("name").reindex(self.locations)
+        src = np.repeat(np.arange(n), np.diff(self.offsets))
+        dst = self.targets
+        distances = self.distances
+
+        buildings = pd.factorize(meta["building"])[0] if "building" in meta else np.full(n, -1)
+        cross = ~((buildings[src] >= 0) & (buildings[src] == buildings[dst]))
+        building_cost = float(distances[cross].min()) if cross.any() else 0.0
+
+        floors = pd.to_numeric(meta["floor"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan) \
+            if "floor" in meta else np.full(n, np.nan)
+        floor_cost = 0.0
+        if not np.isnan(floors).any():
+            change = np.abs(floors[src] - floors[dst])
+            if (change > 0).any():
+                floor_cost = float((distances[change > 0] / change[change > 0]).min())
+
+        xs = ys = np.full(n, np.nan)
+        if "x" in meta and "y" in meta:
+            xs = pd.to_numeric(meta["x"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            ys = pd.to_numeric(meta["y"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        coord_scale = 0.0
+        if not (np.isnan(xs).any() or np.isnan(ys).any()):
+            straight = np.hypot(xs[src] - xs[dst], ys[src] - ys[dst])
+            if (straight > 0).any():
+                coord_scale = float((distances[straight > 0] / straight[straight > 0]).min())
+
+        self.location_meta = {
+            "buildings": buildings.tolist(),
+            "floors": floors.tolist(),
+            "x": xs.tolist(),
+            "y": ys.tolist(),
+            "building_cost": building_cost,
+            "floor_cost": floor_cost,
+            "coord_scale": coord_scale,
+        }
+
+    def _heuristic(self, target):
+        meta = self.location_meta
+        if meta is None or target is None:
+            return None
+
+        buildings, floors, xs, ys = meta["buildings"], meta["floors"], meta["x"], meta["y"]
+        building_cost = meta["building_cost"] if buildings[target] >= 0 else 0.0
+        floor_cost, coord_scale = meta["floor_cost"], meta["coord_scale"]
+        if not (building_cost or floor_cost or coord_scale):
+            return None
+
+        goal_building, goal_floor, goal_x, goal_y = buildings[target], floors[target], xs[target], ys[target]
+
+        def estimate(node):
+            best = 0.0
+            if building_cost and buildings[node] != goal_building and buildings[node] >= 0:
+                best = building_cost
+            if floor_cost:
+                best = max(best, floor_cost * abs(floors[node] - goal_floor))
+            if coord_scale:
+                best = max(best, coord_scale * math.hypot(xs[node] - goal_x, ys[node] - goal_y))
+            return best
+
+        return estimate
+
+    # ---------------- Binary Blob ----------------
+    def to_bytes(self, stamp=None):
+        """One blob: magic, header length, JSON header, 8-byte aligned arrays, location names.
+
+        Attached location metadata is stored too, and stamp (any JSON value)
+        is kept in the header for the caller to check staleness with.
+        """
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in BLOB_ARRAYS}
+        meta = self.location_meta
+        if meta is not None:
+            for name, dtype in META_ARRAYS.items():
+                arrays[f"location_{name}"] = np.asarray(meta[name], dtype=dtype)
+        names = "\0".join(self.locations).encode("utf-8")
+
+        layout, position = {}, 0
+        for name, array in arrays.items():
+            layout[name] = {"dtype": array.dtype.str, "count": int(array.size), "offset": position}
+            position += -(-array.nbytes // BLOB_ALIGN) * BLOB_ALIGN
+        layout["locations"] = {"offset": position, "length": len(names), "count": len(self.locations)}
+        if meta is not None:
+            layout["location_costs"] = {name: meta[name] for name in META_COSTS}
+        layout["stamp"] = stamp
+
+        header = json.dumps(layout).encode("utf-8")
+        header += b" " * (-(len(BLOB_MAGIC) + 8 + len(header)) % BLOB_ALIGN)
+        chunks = [BLOB_MAGIC, len(header).to_bytes(8, "little"), header]
+        for array in arrays.values():
+            data = array.tobytes()
+            chunks.append(data + b"\0" * (-len(data) % BLOB_ALIGN))
+        chunks.append(names)
+        return b"".join(chunks)
+
+    @classmethod
+    def from_bytes(cls, blob):
+        """Rebuild a graph from to_bytes() output; the arrays are zero-copy views into blob.
+
+        The header's stamp is set as graph.stamp.
+        """
+        if bytes(blob[:len(BLOB_MAGIC)]) != BLOB_MAGIC:
+            raise ValueError("Not a route graph blob")
+
+        base = len(BLOB_MAGIC) + 8
+        header_length = int.from_bytes(bytes(blob[len(BLOB_MAGIC):base]), "little")
+        layout = json.loads(bytes(blob[base:base + header_length]))
+        base += header_length
+
+        def array(name):
+            return np.frombuffer(blob, dtype=np.dtype(layout[name]["dtype"]),
+                                 count=layout[name]["count"], offset=base + layout[name]["offset"])
+
+        meta = layout["locations"]
+        start = base + meta["offset"]
+        names = bytes(blob[start:start + meta["length"]]).decode("utf-8")
+
+        graph = cls.__new__(cls)
+        graph._set_arrays(names.split("\0") if meta["count"] else [],
+                          **{name: array(name) for name in BLOB_ARRAYS if name in layout})
+        if "location_costs" in layout:
+            graph.location_meta = {
+                **{name: array(f"location_{name}").tolist() for name in META_ARRAYS},
+                **layout["location_costs"],
+            }
+        graph.stamp = layout.get("stamp")
+        return graph
+
+    def save(self, path, stamp=None):
+        """Write the blob to path atomically: readers see the old file or the new one, whole."""
+        # A temporary file of this writer's own, so concurrent saves never mix
+        fd, tmp = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=os.path.dirname(path) or ".")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.to_bytes(stamp))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """Map a saved blob read-only; the arrays share the file's pages with every other process."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_bytes(memoryview(mapped))
+
+    # ---------------- Dijkstra ----------------
+    def distances_from(self, start, accessible_only=False):
+        """Shortest distance from start to every reachable location."""
+        if start not in self.location_index:
+            return {}
+        dist, _, _ = self._search(self.location_index[start], None, accessible_only)
+        return {self.locations[node]: d for node, d in dist.items()}
+
+    def shortest_path(self, start, end, accessible_only=False, astar=False):
+        """Return the cheapest path from start to end, or None if unreachable.
+
+        With astar the search is goal-directed using attach_locations() metadata;
+        it returns the same distance as plain Dijkstra.
+        """
+        if start not in self.location_index or end not in self.location_index:
+            return None
+        path = self._shortest(self.location_index[start], self.location_index[end], accessible_only, astar=astar)
+        return None if path is None else self._make_path(start, path)
+
+    def explored(self, start, end, accessible_only=False, astar=False):
+        """Number of locations a shortest_path() query settles before reaching end."""
+        return self._search(self.location_index[start], self.location_index[end], accessible_only, astar=astar)[2]
+
+    def _search(self, source, target, accessible_only=False, skip_nodes=(), skip_slots=(), astar=False):
+        offsets, targets, distances = self.offsets, self.targets, self.distances
+        estimate = self._heuristic(target) if astar else None
+        dist = {source: 0.0}
+        prev = {}
+        heap = [(estimate(source) if estimate else 0.0, 0.0, source)]
+        settled = 0
+
+        while heap:
+            _, d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            settled += 1
+            if node == target:
+                break
+
+            if accessible_only:
+                slots = self._slots(node, True)
+                edges = zip(slots.tolist(), targets[slots].tolist(), distances[slots].tolist())
+            else:
+                lo, hi = int(offsets[node]), int(offsets[node + 1])
+                edges = zip(range(lo, hi), targets[lo:hi].tolist(), distances[lo:hi].tolist())
+
+            for slot, neighbour, weight in edges:
+                if neighbour in skip_nodes or slot in skip_slots:
+                    continue
+                nd = d + weight
+                if nd < dist.get(neighbour, math.inf):
+                    dist[neighbour] = nd
+                    prev[neighbour] = (node, slot)
+                    heapq.heappush(heap, (nd + estimate(neighbour) if estimate else nd, nd, neighbour))
+
+        return dist, prev, settled
+
+    def _shortest(self, source, target, accessible_only=False, skip_nodes=(), skip_slots=(), astar=False):
+        """Cheapest path as a list of (from node, slot) steps, or None if unreachable."""
+        dist, prev, _ = self._search(source, target, accessible_only, skip_nodes, skip_slots, astar)
+        if target not in dist:
+            return None
+
+        path = []
+        node = target
+        while node != source:
+            parent, slot = prev[node]
+            path.append((parent, slot))
+            node = parent
+        path.reverse()
+        return path
+
+    def _make_path(self, start, path):
+        return make_path(start, [
+            {
+                "from": self.locations[node],
+                "to": self.locations[self.targets[slot]],
+                "distance_m": float(self.distances[slot]),
+                "accessible": self._is_accessible(slot),
+                "route_id": self._route_id(slot),
+            }
+            for node, slot in path
+        ])
+
+    # ---------------- Yen's K Shortest Paths ----------------
+    def k_shortest_paths(self, start, end, k, accessible_only=False, time_budget=None, astar=False):
+        """Up to k loopless paths from start to end, cheapest first.
+
+        Parallel routes count as distinct paths. Returns (paths, complete);
+        complete is False when time_budget (seconds) ran out before k paths
+        were found or ruled out. astar makes every spur search goal-directed.
+        """
+        if start not in self.location_index or end not in self.location_index or k < 1:
+            return [], True
+
+        source, target = self.location_index[start], self.location_index[end]
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+
+        first = self._shortest(source, target, accessible_only, astar=astar)
+        if first is None:
+            return [], True
+
+        found = [first]
+        seen = {path_slots(first)}
+        candidates = []
+        counter = 0
+
+        while len(found) < k:
+            previous = found[-1]
+            for i in range(len(previous)):
+                if deadline is not None and time.perf_counter() > deadline:
+                    return [self._make_path(start, path) for path in found], False
+
+                root = previous[:i]
+                spur = previous[i][0]
+                root_key = path_slots(root)
+
+                # Block every way out of the spur node already taken by a found path with this root
+                skip_slots = {path[i][1] for path in found if len(path) > i and path_slots(path[:i]) == root_key}
+                skip_nodes = {node for node, _ in root}
+
+                spur_path = self._shortest(spur, target, accessible_only, skip_nodes, skip_slots, astar)
+                if spur_path is None:
+                    continue
+
+                path = root + spur_path
+                key = path_slots(path)
+                if key not in seen:
+                    seen.add(key)
+                    counter += 1
+                    heapq.heappush(candidates, (float(self.distances[list(key)].sum()), counter, path))
+
+            if not candidates:
+                break
+            found.append(heapq.heappop(candidates)[2])
+
+        return [self._make_path(start, path) for path in found], True
+
+
+def path_slots(path):
+    return tuple(slot for _, slot in path)
+
+
+def make_path(start, legs):
+    return {
+        "path": [start] + [leg["to"] for leg in legs],
+        "legs": legs,
+        "distance_m": sum(leg["distance_m"] for leg in legs),
+        "accessible": all(leg["accessible"] for leg in legs),
+    }
+
+
+def path_key(legs):
+    return tuple((leg["from"], leg["to"], leg["route_id"]) for leg in legs)
+
+
+def format_distance(distance):
+    distance = float(distance)
+    return str(int(distance)) if distance.is_integer() else f"{distance:.1f}"
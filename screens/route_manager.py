@@ -1,60 +1,135 @@
-import os
+import threading
+from collections import OrderedDict
 import dash
-import pandas as pd
-from dash import html, dcc, Input, Output, State, callback
-from dash.dependencies import ALL
+from dash import html, dcc, dash_table, Input, Output, State, Patch, callback
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
+import pandas as pd
 
-CSV_PATH = "data/routes.csv"
-NOTIF_CSV_PATH = "data/notification.csv"
-BLUE = "#2f80ed"
+from screens import repository
+from screens.bulk_io import bulk_card, import_upload, import_result
+from screens.render_cache import RenderCache
+from screens.route_finder import routes_changed
 
-os.makedirs("data", exist_ok=True)
+BLUE = "#2f80ed"
 
-# ---------------- CSV Read / Write ----------------
-def read_routes():
-    if os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
-        df["accessible"] = df["accessible"].apply(lambda x: True if str(x).lower() == "true" else False)
-        return df
-    return pd.DataFrame(columns=["id", "start_location", "end_location", "distance_m", "accessible"])
+# The routes table is paged and sorted on the server: the browser only holds
+# PAGE_SIZE rows, sliced from a sort order computed once per (table version,
+# sort columns) and kept for the SORT_CACHE_SIZE most recent sorts
+PAGE_SIZE = 25
+SORT_CACHE_SIZE = 8
+_sort_cache = {"version": None, "orders": OrderedDict()}
+_sort_lock = threading.Lock()
+_render_cache = RenderCache()
 
-def save_routes(df):
-    df.to_csv(CSV_PATH, index=False)
+COLUMNS = [
+    {"name": "ID", "id": "id"},
+    {"name": "Start", "id": "start_location"},
+    {"name": "End", "id": "end_location"},
+    {"name": "Distance", "id": "distance_m"},
+    {"name": "Accessible", "id": "accessible"},
+    {"name": "", "id": "edit"},
+    {"name": "", "id": "delete"},
+]
+SORTABLE = ["id", "start_location", "end_location", "distance_m", "accessible"]
 
+# ---------------- Notifications ----------------
 def add_notification(message, user_id=1):
-    if os.path.exists(NOTIF_CSV_PATH):
-        df = pd.read_csv(NOTIF_CSV_PATH)
-    else:
-        df = pd.DataFrame(columns=["id","user_id","message","delivered"])
-    new_id = int(df.id.max()) + 1 if not df.empty else 1
-    df = pd.concat([df, pd.DataFrame([{"id": new_id, "user_id": user_id, "message": message, "delivered": False}])], ignore_index=True)
-    df.to_csv(NOTIF_CSV_PATH, index=False)
+    repository.notifications.insert({"user_id": user_id, "message": message, "delivered": False})
 
 # ---------------- Table ----------------
-def generate_table(df):
-    if df.empty:
-        return dbc.Alert("No routes found", color="warning")
-    header = html.Tr([html.Th(c) for c in ["ID","Start","End","Distance","Accessible","Actions"]])
-    rows = []
-    for _, r in df.iterrows():
-        rows.append(html.Tr([
-            html.Td(r.id),
-            html.Td(r.start_location),
-            html.Td(r.end_location),
-            html.Td(r.distance_m),
-            html.Td("Yes" if r.accessible else "No", style={"color": BLUE if r.accessible else "red", "fontWeight":"bold"}),
-            html.Td([
-                dbc.Button("Edit", id={"type":"edit","index":r.id}, className="btn-edit me-1", size="sm"),
-                dbc.Button("Delete", id={"type":"delete","index":r.id}, className="btn-delete", size="sm")
-            ])
-        ]))
-    return dbc.Table([header]+rows, bordered=True, hover=True, striped=True, responsive=True, className="shadow-sm")
+def sort_key(values):
+    # Categories sort by name rather than by the order they were first seen in
+    return values.astype("string") if isinstance(values.dtype, pd.CategoricalDtype) else values
+
+
+def sort_columns(sort_by):
+    """DataTable sort_by as a tuple of (column, direction), sortable columns only."""
+    return tuple((s["column_id"], s["direction"]) for s in sort_by or () if s["column_id"] in SORTABLE)
+
+
+def sort_order(version, df, sort_by):
+    """Row positions of df in DataTable sort_by order (None for table order), cached per table version."""
+    key = sort_columns(sort_by)
+    if not key:
+        return None
+
+    with _sort_lock:
+        if _sort_cache["version"] != version:
+            _sort_cache.update(version=version, orders=OrderedDict())
+        orders = _sort_cache["orders"]
+        if key in orders:
+            orders.move_to_end(key)
+            return orders[key]
+
+    columns = [column for column, _ in key]
+    order = df[columns].reset_index(drop=True).sort_values(
+        columns, ascending=[direction == "asc" for _, direction in key],
+        kind="stable", na_position="last", key=sort_key
+    ).index.to_numpy()
+
+    with _sort_lock:
+        if _sort_cache["version"] == version:
+            orders[key] = order
+            while len(orders) > SORT_CACHE_SIZE:
+                orders.popitem(last=False)
+    return order
+
+
+def page_records(rows):
+    return [{
+        "id": repository.plain(r["id"]),
+        "start_location": repository.plain(r["start_location"]),
+        "end_location": repository.plain(r["end_location"]),
+        "distance_m": repository.plain(r["distance_m"]),
+        "accessible": "Yes" if r["accessible"] is True else "No",
+        "edit": "Edit",
+        "delete": "Delete",
+    } for r in rows.to_dict("records")]
+
+
+def routes_page(page=0, sort_by=None):
+    """(rows of one page, page count, page number, data version) with the page clamped to the table."""
+    stamp, version, df = repository.routes.stamped()
+
+    def render():
+        page_count = max(1, -(-len(df) // PAGE_SIZE))
+        clamped = min(max(page or 0, 0), page_count - 1)
+        start = clamped * PAGE_SIZE
+
+        order = sort_order(version, df, sort_by)
+        rows = df.iloc[start:start + PAGE_SIZE] if order is None else df.iloc[order[start:start + PAGE_SIZE]]
+        return page_records(rows), page_count, clamped
+
+    return (*_render_cache.get(version, (sort_columns(sort_by), page or 0), render), stamp)
+
+
+def routes_table(rows, page_count):
+    return dash_table.DataTable(
+        id="routes-table",
+        columns=COLUMNS,
+        data=rows,
+        page_action="custom",
+        page_current=0,
+        page_size=PAGE_SIZE,
+        page_count=page_count,
+        sort_action="custom",
+        sort_mode="single",
+        sort_by=[],
+        style_table={"overflowX": "auto"},
+        style_cell={"padding": "8px", "textAlign": "left", "fontFamily": "inherit"},
+        style_header={"fontWeight": "bold", "backgroundColor": "#f8f9fa"},
+        style_data_conditional=[
+            {"if": {"filter_query": "{accessible} = Yes", "column_id": "accessible"}, "color": BLUE, "fontWeight": "bold"},
+            {"if": {"filter_query": "{accessible} = No", "column_id": "accessible"}, "color": "red", "fontWeight": "bold"},
+            {"if": {"column_id": "edit"}, "color": BLUE, "cursor": "pointer", "fontWeight": "bold"},
+            {"if": {"column_id": "delete"}, "color": "red", "cursor": "pointer", "fontWeight": "bold"},
+        ],
+    )
 
 # ---------------- Layout ----------------
 def routes_layout():
-    df = read_routes()
+    rows, page_count, _, stamp = routes_page()
     return dbc.Container([
         html.H3("Routes Management", className="mb-4 text-primary fw-bold"),
         dbc.Card([
@@ -73,17 +148,39 @@ def routes_layout():
                 ], className="justify-content-end")
             ])
         ], className="mb-4 shadow-sm"),
+        bulk_card("routes"),
         dbc.Card([
-            html.Div(id="table", children=generate_table(df))
+            dcc.Store(id="routes-rendered", data=stamp),
+            dcc.Store(id="routes-reload"),
+            html.Div(id="table", className="p-3", children=routes_table(rows, page_count))
         ])
     ], fluid=True)
 
 # ---------------- REGISTER CALLBACKS ----------------
 def register_routes_callbacks(app):
 
+    # ---------------- Page / Sort ----------------
+    # routes-rendered holds the data version of the page on screen. Edits and
+    # deletes patch their row into that page; other writes set routes-reload
+    # to have this callback re-slice it
+    @app.callback(
+        Output("routes-table","data"),
+        Output("routes-table","page_count"),
+        Output("routes-table","page_current"),
+        Output("routes-rendered","data"),
+        Input("routes-table","page_current"),
+        Input("routes-table","sort_by"),
+        Input("routes-reload","data"),
+        prevent_initial_call=True
+    )
+    def show_routes_page(page, sort_by, _):
+        return routes_page(page, sort_by)
+
     # ---------------- Add / Update / Reset ----------------
     @app.callback(
-        Output("table","children", allow_duplicate=True),
+        Output("routes-reload","data", allow_duplicate=True),
+        Output("routes-table","data", allow_duplicate=True),
+        Output("routes-rendered","data", allow_duplicate=True),
         Output("start","value"),
         Output("end","value"),
         Output("distance","value"),
@@ -97,34 +194,50 @@ def register_routes_callbacks(app):
         State("distance","value"),
         State("accessible","value"),
         State("edit-id","data"),
+        State("routes-table","data"),
+        State("routes-rendered","data"),
         prevent_initial_call=True
     )
-    def add_update_reset(add_click, reset_click, s, e, d, a, edit_id):
+    def add_update_reset(add_click, reset_click, s, e, d, a, edit_id, page, rendered):
         ctx = dash.callback_context
         trigger = ctx.triggered[0]["prop_id"]
-
-        df = read_routes()
+        cleared = ("", "", None, None, "Add", None)
 
         # Reset
         if trigger == "reset-btn.n_clicks":
-            return generate_table(df), "", "", None, None, "Add", None
+            return dash.no_update, dash.no_update, dash.no_update, *cleared
 
         # Add / Update
         if not all([s,e]) or d is None or a is None:
             raise PreventUpdate
 
+        changed = {(s, e)}
+        values = {"start_location":s,"end_location":e,"distance_m":d,"accessible":a}
+        current = rendered == repository.routes.stamp()
         if edit_id is not None:
-            df.loc[df.id == edit_id, ["start_location","end_location","distance_m","accessible"]] = [s,e,d,a]
+            old = repository.routes.get(edit_id)
+            if old is not None:
+                changed.add((old["start_location"], old["end_location"]))
+            repository.routes.update(edit_id, values)
             add_notification(f"Route '{s} → {e}' updated")
         else:
-            new_id = int(df.id.max())+1 if not df.empty else 1
-            df = pd.concat([df, pd.DataFrame([{"id":new_id,"start_location":s,"end_location":e,"distance_m":d,"accessible":a}])], ignore_index=True)
+            repository.routes.insert(values)
             add_notification(f"New route '{s} → {e}' added")
 
-        save_routes(df)
-        return generate_table(df), "", "", None, None, "Add", None
+        routes_changed(changed)
+        stamp = repository.routes.stamp()
+
+        # An edited row on the current page is replaced in place
+        row = next((i for i, r in enumerate(page or []) if r["id"] == edit_id), None)
+        if edit_id is not None and current and row is not None:
+            patch = Patch()
+            df = repository.routes.frame()
+            patch[row] = page_records(df[df.id == edit_id])[0]
+            return dash.no_update, patch, stamp, *cleared
+        return stamp, dash.no_update, dash.no_update, *cleared
 
     # ---------------- Edit ----------------
+    # The Edit / Delete cells of the table act as buttons
     @app.callback(
         Output("start","value", allow_duplicate=True),
         Output("end","value", allow_duplicate=True),
@@ -132,29 +245,78 @@ def register_routes_callbacks(app):
         Output("accessible","value", allow_duplicate=True),
         Output("add-btn","children", allow_duplicate=True),
         Output("edit-id","data", allow_duplicate=True),
-        Input({"type":"edit","index":ALL},"n_clicks"),
+        Output("routes-table","active_cell", allow_duplicate=True),
+        Input("routes-table","active_cell"),
         prevent_initial_call=True
     )
-    def edit_route(clicks):
-        if not any(clicks):
+    def edit_route(cell):
+        if not cell or cell["column_id"] != "edit":
+            raise PreventUpdate
+        route_id = cell["row_id"]
+        r = repository.routes.get(route_id)
+        if r is None:
             raise PreventUpdate
-        route_id = dash.callback_context.triggered_id["index"]
-        df = read_routes()
-        r = df[df.id==route_id].iloc[0]
-        return r.start_location, r.end_location, r.distance_m, r.accessible, "Update", route_id
+        return r["start_location"], r["end_location"], r["distance_m"], r["accessible"], "Update", route_id, None
 
     # ---------------- Delete ----------------
+    # The row is removed from the page on screen; the page refills on the
+    # next paging or sort
     @app.callback(
-        Output("table","children", allow_duplicate=True),
-        Input({"type":"delete","index":ALL},"n_clicks"),
+        Output("routes-table","data", allow_duplicate=True),
+        Output("routes-rendered","data", allow_duplicate=True),
+        Output("routes-reload","data", allow_duplicate=True),
+        Output("routes-table","active_cell", allow_duplicate=True),
+        Input("routes-table","active_cell"),
+        State("routes-rendered","data"),
         prevent_initial_call=True
     )
-    def delete_route(clicks):
-        if not any(clicks):
+    def delete_route(cell, rendered):
+        if not cell or cell["column_id"] != "delete":
             raise PreventUpdate
-        route_id = dash.callback_context.triggered_id["index"]
-        df = read_routes()
-        df = df[df.id != route_id]
-        save_routes(df)
+        route_id = cell["row_id"]
+        old = repository.routes.get(route_id)
+        if old is None:
+            raise PreventUpdate
+        current = rendered == repository.routes.stamp()
+        repository.routes.delete(route_id)
+        routes_changed({(old["start_location"], old["end_location"])})
         add_notification(f"Route {route_id} deleted")
-        return generate_table(df)
+
+        stamp = repository.routes.stamp()
+        if not current:
+            return dash.no_update, dash.no_update, stamp, None
+        patch = Patch()
+        del patch[cell["row"]]
+        return patch, stamp, dash.no_update, None
+
+    # ---------------- Bulk Import ----------------
+    @app.callback(
+        Output("routes-reload","data", allow_duplicate=True),
+        Output("routes-import-result","children"),
+        Output("routes-upload","contents"),
+        Input("routes-upload","contents"),
+        State("routes-import-replace","value"),
+        prevent_initial_call=True
+    )
+    def import_routes(contents, replace):
+        if not contents:
+            raise PreventUpdate
+        report = import_upload(repository.routes, contents, replace=bool(replace))
+        if report["imported"]:
+            routes_changed()
+            add_notification(f"{report['imported']} routes imported")
+        return repository.routes.stamp(), import_result(report), None
+
+    # ---------------- Refresh ----------------
+    # Re-render when the routes table changed elsewhere (another admin or worker)
+    @app.callback(
+        Output("routes-reload","data", allow_duplicate=True),
+        Input("data-versions","data"),
+        State("routes-rendered","data"),
+        prevent_initial_call=True
+    )
+    def refresh_routes(_, rendered):
+        stamp = repository.routes.stamp()
+        if stamp == rendered:
+            raise PreventUpdate
+        return stamp
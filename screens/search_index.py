@@ -0,0 +1,77 @@
+import bisect
+
+import numpy as np
+
+NGRAM = 3
+
+
+# ---------------- Name Search Index ----------------
+class NameSearchIndex:
+    """Prefix + substring search over a fixed list of names, case-insensitive.
+
+    Prefix matches come from bisecting the sorted lower-cased names;
+    substring matches intersect trigram posting lists instead of scanning
+    every name. Results are returned prefix matches first, in name order.
+    Queries shorter than NGRAM characters fall back to a scan that stops
+    once enough names are found.
+    """
+
+    def __init__(self, names):
+        self.names = sorted(set(names), key=lambda name: (name.lower(), name))
+        self.keys = [name.lower() for name in self.names]
+
+        postings = {}
+        for i, key in enumerate(self.keys):
+            for gram in {key[j:j + NGRAM] for j in range(len(key) - NGRAM + 1)}:
+                postings.setdefault(gram, []).append(i)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def prefix_ids(self, query, limit=None):
+        lo = bisect.bisect_left(self.keys, query)
+        hi = bisect.bisect_left(self.keys, query + "\U0010ffff")
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return range(lo, hi)
+
+    def substring_ids(self, query):
+        """Ids of names containing query (sorted); query must be at least NGRAM characters."""
+        grams = sorted({query[j:j + NGRAM] for j in range(len(query) - NGRAM + 1)},
+                       key=lambda gram: len(self.postings.get(gram, ())))
+        ids = self.postings.get(grams[0])
+        if ids is None:
+            return np.zeros(0, dtype=np.int32)
+        for gram in grams[1:]:
+            ids = np.intersect1d(ids, self.postings.get(gram, ids[:0]), assume_unique=True)
+            if not len(ids):
+                return ids
+        if len(query) > NGRAM:
+            ids = np.array([i for i in ids.tolist() if query in self.keys[i]], dtype=np.int32)
+        return ids
+
+    def containing_ids(self, query):
+        """Ids of every name containing query (sorted); query must already be lower-cased."""
+        if len(query) >= NGRAM:
+            return self.substring_ids(query)
+        return np.array([i for i, key in enumerate(self.keys) if query in key], dtype=np.int32)
+
+    def search(self, query, limit=20):
+        query = (query or "").strip().lower()
+        if not query:
+            return self.names[:limit]
+
+        found = list(self.prefix_ids(query, limit))
+        if len(found) < limit:
+            seen = set(found)
+            if len(query) >= NGRAM:
+                candidates = self.substring_ids(query).tolist()
+            else:
+                candidates = (i for i, key in enumerate(self.keys) if query in key)
+            for i in candidates:
+                if i not in seen:
+                    found.append(i)
+                    if len(found) >= limit:
+                        break
+        return [self.names[i] for i in found]
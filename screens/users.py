@@ -1,45 +1,14 @@
 from dash import html, dcc, Input, Output, State, ctx, ALL
 import dash_bootstrap_components as dbc
 import dash
-import csv
-import os
 import uuid
 
-# ---------------- ENSURE DATA FOLDER ----------------
-os.makedirs("data", exist_ok=True)
-CSV_PATH = "data/users.csv"
-
-FIELDS = ["id", "username", "password", "full_name", "email", "role", "status"]
-
-# ---------------- READ USERS ----------------
-def read_users():
-    if not os.path.exists(CSV_PATH):
-        admin = [{
-            "id": str(uuid.uuid4()),
-            "username": "admin",
-            "password": "1234",
-            "full_name": "Admin User",
-            "email": "admin@test.com",
-            "role": "admin",
-            "status": "active",
-        }]
-        write_users(admin)
-        return admin
-
-    with open(CSV_PATH, "r", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
-
-# ---------------- WRITE USERS ----------------
-def write_users(users):
-    with open(CSV_PATH, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDS)
-        writer.writeheader()
-        writer.writerows(users)
+from screens import repository
 
 # ---------------- LAYOUT ----------------
 def users_tab_layout():
     # Initialize with users data
-    users = read_users()
+    users = repository.users.records()
     return html.Div([
         html.H3("👥 Users Management", className="mb-4"),
 
@@ -157,7 +126,7 @@ def register_users_callbacks(app):
 
         # If no users data, initialize (shouldn't happen with initialized store)
         if users is None:
-            users = read_users()
+            users = repository.users.records()
 
         # -------- CANCEL --------
         if trig == "cancel-user-btn":
@@ -180,7 +149,7 @@ def register_users_callbacks(app):
         # -------- SAVE USER --------
         if trig == "save-user-btn":
             if index is None:
-                users.append({
+                repository.users.insert({
                     "id": str(uuid.uuid4()),
                     "username": username,
                     "password": password,
@@ -190,23 +159,21 @@ def register_users_callbacks(app):
                     "status": status
                 })
             else:
-                u = users[index]
-                u.update({
+                values = {
                     "full_name": fullname,
                     "email": email,
                     "role": role,
                     "status": status
-                })
+                }
                 if password:
-                    u["password"] = password
-            write_users(users)
-            return users, False, "", None, "", False, "", "", "", "student", "active"
+                    values["password"] = password
+                repository.users.update(users[index]["id"], values)
+            return repository.users.records(), False, "", None, "", False, "", "", "", "student", "active"
 
         # -------- DELETE USER --------
         if isinstance(trig, dict) and trig.get("type") == "delete-user":
-            users = [u for u in users if u["id"] != trig["id"]]
-            write_users(users)
-            return users, False, "", None, "", False, "", "", "", "student", "active"
+            repository.users.delete(trig["id"])
+            return repository.users.records(), False, "", None, "", False, "", "", "", "student", "active"
 
         # If no trigger (initial load), just return current data
         return users, False, "", None, "", False, "", "", "", "student", "active"
@@ -0,0 +1,126 @@
+import sys
+import os
+import io
+
+import pandas as pd
+
+# Add the current directory to the path so we can import the screens package
+sys.path.insert(0, os.path.dirname(__file__))
+
+from screens import bulk_io, repository
+
+
+def routes_table(tmp_path):
+    path = tmp_path / "routes.csv"
+    pd.DataFrame([
+        (1, "Gym", "Library", 310, "False"),
+        (2, "Library", "Cafeteria", 291, "True"),
+    ], columns=repository.routes.columns).to_csv(path, index=False)
+    return repository.routes.at(str(path))
+
+
+def csv(text):
+    return io.StringIO(text)
+
+
+def test_import_appends_in_one_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_io, "IMPORT_CHUNK_ROWS", 2)
+    table = routes_table(tmp_path)
+    saves = []
+    save = table.backend.save
+    monkeypatch.setattr(table.backend, "save", lambda df: (saves.append(len(df)), save(df)))
+
+    report = bulk_io.import_csv(table, csv(
+        "id,start_location,end_location,distance_m,accessible\n"
+        "7,Gym,Pool,12,yes\n"
+        "8,Pool,Annex,4.5,False\n"
+        "9, Annex ,Car Park,30,true\n"
+    ))
+
+    assert report == {"table": "routes", "imported": 3, "replace": False, "error_count": 0, "errors": []}
+    assert saves == [5]
+    df = table.at(table.path).frame()
+    assert df.id.tolist() == [1, 2, 3, 4, 5]
+    assert df.start_location.tolist() == ["Gym", "Library", "Gym", "Pool", "Annex"]
+    assert df.accessible.tolist() == [False, True, True, False, True]
+    assert str(df.start_location.dtype) == "category"
+
+
+def test_import_reports_row_errors_and_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_io, "IMPORT_CHUNK_ROWS", 2)
+    table = routes_table(tmp_path)
+    before = open(table.path, encoding="utf-8").read()
+
+    report = bulk_io.import_csv(table, csv(
+        "start_location,end_location,distance_m,accessible\n"
+        "Gym,Pool,12,True\n"
+        "Pool,,4,True\n"
+        "Annex,Gym,far,True\n"
+        "Annex,Gym,-3,maybe\n"
+        "Gym,Annex,inf,True\n"
+    ))
+
+    assert report["imported"] == 0 and report["error_count"] == 5
+    assert [(e["line"], e["column"]) for e in report["errors"]] == [
+        (3, "end_location"), (4, "distance_m"), (5, "accessible"), (5, "distance_m"), (6, "distance_m"),
+    ]
+    assert open(table.path, encoding="utf-8").read() == before
+
+
+def test_import_checks_the_header(tmp_path):
+    table = routes_table(tmp_path)
+
+    assert bulk_io.import_csv(table, csv("start_location,end_location\nGym,Pool\n"))["errors"][0]["message"] \
+        == "Missing columns: distance_m, accessible"
+    assert bulk_io.import_csv(table, csv(""))["errors"][0]["message"] == "The file is empty"
+
+
+def test_import_without_rows_replaces_nothing(tmp_path):
+    table = routes_table(tmp_path)
+    before = open(table.path, encoding="utf-8").read()
+
+    report = bulk_io.import_csv(table, csv("start_location,end_location,distance_m,accessible\n"), replace=True)
+
+    assert report["imported"] == 0
+    assert report["errors"][0]["message"] == "The file has no rows"
+    assert open(table.path, encoding="utf-8").read() == before
+
+
+def test_import_can_replace_every_row(tmp_path):
+    table = routes_table(tmp_path)
+
+    report = bulk_io.import_csv(table, csv("start_location,end_location,distance_m,accessible\nA,B,1,True\n"),
+                                replace=True)
+
+    assert report["imported"] == 1
+    df = table.frame()
+    assert df.id.tolist() == [3] and df.start_location.tolist() == ["A"]
+
+
+def test_export_streams_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_io, "EXPORT_CHUNK_ROWS", 1)
+    table = routes_table(tmp_path)
+
+    chunks = list(bulk_io.export_csv(table))
+
+    assert chunks == [
+        "id,start_location,end_location,distance_m,accessible\n",
+        "1,Gym,Library,310,False\n",
+        "2,Library,Cafeteria,291,True\n",
+    ]
+
+
+def test_api_requires_admin_and_known_tables():
+    from main import app
+    client = app.server.test_client()
+
+    assert client.post("/api/import/routes", data="").status_code == 401
+    assert client.post("/api/import/users", data="").status_code == 404
+    assert client.get("/api/export/users.csv").status_code == 404
+
+    assert client.get("/api/export/locations.csv").status_code == 401
+    assert client.get("/api/export/locations.csv", auth=("admin", "wrong")).status_code == 401
+
+    response = client.get("/api/export/locations.csv", auth=("admin", "1234"))
+    assert response.status_code == 200 and response.is_streamed
+    assert response.get_data(as_text=True).splitlines()[0] == "id,name,building,floor,accessible"
@@ -0,0 +1,96 @@
+import sys
+import os
+
+# Add the current directory to the path so we can import the main module
+sys.path.insert(0, os.path.dirname(__file__))
+
+from main import app
+from screens import distance_api
+from screens.route_finder import get_route_graph
+
+
+def post(body):
+    return app.server.test_client().post("/api/distance-matrix", json=body)
+
+
+def test_pairs_match_route_finder():
+    """Batched pair distances agree with the single-query route finder"""
+    graph = get_route_graph()
+    pairs = [[s, e] for s in graph.locations for e in graph.locations] + [["Gym", "Nowhere"]]
+
+    response = post({"pairs": pairs})
+    assert response.status_code == 200
+
+    for result in response.get_json()["results"]:
+        expected = graph.shortest_path(result["start"], result["end"])
+        assert result["distance_m"] == (expected["distance_m"] if expected else None)
+
+
+def test_location_matrix():
+    """A location list returns a square matrix, accessible-only if asked"""
+    graph = get_route_graph()
+    locations = graph.locations[:3]
+
+    body = post({"locations": locations, "accessible_only": True}).get_json()
+    assert body["locations"] == locations
+    for i, start in enumerate(locations):
+        for j, end in enumerate(locations):
+            expected = graph.shortest_path(start, end, accessible_only=True)
+            assert body["distances_m"][i][j] == (expected["distance_m"] if expected else None)
+
+
+def test_fallback_without_scipy():
+    """Without scipy the matrix is computed with one graph search per source"""
+    graph = get_route_graph()
+    pairs = [(s, e) for s in graph.locations for e in graph.locations]
+    original = distance_api.dijkstra
+    distance_api.dijkstra = None
+    try:
+        distances = distance_api.pair_distances(graph, pairs)
+    finally:
+        distance_api.dijkstra = original
+
+    for (start, end), d in zip(pairs, distances):
+        assert d == graph.shortest_path(start, end)["distance_m"]
+
+
+def test_sources_are_searched_in_chunks():
+    """Chunked searches give the same answers, in the order the pairs were asked"""
+    graph = get_route_graph()
+    pairs = [(s, e) for s in reversed(graph.locations) for e in graph.locations] + [("Nowhere", "Gym")]
+    original = distance_api.SOURCE_CHUNK
+    distance_api.SOURCE_CHUNK = 2
+    try:
+        distances = distance_api.pair_distances(graph, pairs)
+    finally:
+        distance_api.SOURCE_CHUNK = original
+
+    assert distances[-1] is None
+    for (start, end), d in zip(pairs[:-1], distances):
+        assert d == graph.shortest_path(start, end)["distance_m"]
+
+
+def test_search_size_is_bounded():
+    """Requests needing more than MAX_SEARCH_CELLS entries are refused before searching"""
+    graph = get_route_graph()
+    a, b = graph.locations[:2]
+    original = distance_api.MAX_SEARCH_CELLS
+    distance_api.MAX_SEARCH_CELLS = len(graph.locations)  # one start location
+    try:
+        assert post({"pairs": [[a, b], [a, a]]}).status_code == 200
+        assert post({"pairs": [[a, b], [b, a]]}).status_code == 400
+        assert post({"locations": [a, b]}).status_code == 400
+    finally:
+        distance_api.MAX_SEARCH_CELLS = original
+
+
+def test_bad_request():
+    assert post({}).status_code == 400
+    assert post({"pairs": [["Gym"]]}).status_code == 400
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"PASS: {name}")
@@ -0,0 +1,133 @@
+import sys
+import os
+import random
+import time
+
+import pandas as pd
+
+# Add the current directory to the path so we can import the screens package
+sys.path.insert(0, os.path.dirname(__file__))
+
+from screens import distance_table
+from screens.route_graph import RouteGraph
+from screens.distance_table import BackgroundDistanceTable, DistanceTable
+
+COLUMNS = ["id", "start_location", "end_location", "distance_m", "accessible"]
+
+
+def random_routes(rng, locations=12, routes=30):
+    names = [f"L{i}" for i in range(locations)]
+    rows = []
+    for route_id in range(1, routes + 1):
+        start, end = rng.sample(names, 2)
+        rows.append((route_id, start, end, rng.randint(1, 50), rng.random() < 0.5))
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def assert_matches_dijkstra(table, graph, accessible_only=False):
+    for start in graph.locations:
+        for end in graph.locations:
+            if start == end:
+                continue
+            expected = graph.shortest_path(start, end, accessible_only)
+            actual = table.path(start, end)
+            if expected is None:
+                assert actual is None, (start, end)
+            else:
+                assert actual["distance_m"] == expected["distance_m"], (start, end)
+                assert actual["path"][0] == start and actual["path"][-1] == end
+                assert sum(leg["distance_m"] for leg in actual["legs"]) == actual["distance_m"]
+                assert actual["accessible"] or not accessible_only
+
+
+def test_table_matches_dijkstra():
+    """The precomputed table answers the same distances as a graph search"""
+    rng = random.Random(1)
+    for _ in range(5):
+        graph = RouteGraph(random_routes(rng))
+        assert_matches_dijkstra(DistanceTable(graph), graph)
+        assert_matches_dijkstra(DistanceTable(graph, accessible_only=True), graph, accessible_only=True)
+
+
+def test_incremental_repair_matches_rebuild():
+    """Adding, lengthening, shortening and deleting routes is repaired in place"""
+    rng = random.Random(2)
+    df = random_routes(rng)
+    graph = RouteGraph(df)
+    table = DistanceTable(graph)
+    accessible_table = DistanceTable(graph, accessible_only=True)
+
+    for step in range(60):
+        row = rng.randrange(len(df))
+        old_pair = (df.at[row, "start_location"], df.at[row, "end_location"])
+        action = step % 3
+
+        if action == 0:
+            df.at[row, "distance_m"] = rng.randint(1, 50)
+        elif action == 1 and len(df) > 5:
+            df = df.drop(index=row).reset_index(drop=True)
+        else:
+            start, end = rng.sample(table.locations, 2)
+            df.loc[len(df)] = [1000 + step, start, end, rng.randint(1, 50), True]
+            old_pair = (start, end)
+
+        graph = RouteGraph(df)
+        table.update_pair(*old_pair, graph.best_edge(*old_pair))
+        accessible_table.update_pair(*old_pair, graph.best_edge(*old_pair, accessible_only=True))
+        assert_matches_dijkstra(table, graph)
+        assert_matches_dijkstra(accessible_table, graph, accessible_only=True)
+
+
+def test_incremental_repair_without_scipy():
+    """Without scipy the rows a repair invalidates are searched one at a time"""
+    original = distance_table.dijkstra
+    distance_table.dijkstra = None
+    try:
+        test_incremental_repair_matches_rebuild()
+    finally:
+        distance_table.dijkstra = original
+
+
+def test_repairs_replace_the_table_handed_out():
+    """A table from get() is never changed under its readers"""
+    df = random_routes(random.Random(3))
+    background = BackgroundDistanceTable()
+    background.rebuild(RouteGraph(df))
+    while background.get() is None:
+        time.sleep(0.01)
+    table = background.get()
+    dist = table.dist.copy()
+
+    df.at[0, "distance_m"] = 1000
+    pair = (df.at[0, "start_location"], df.at[0, "end_location"])
+    graph = RouteGraph(df)
+    background.routes_changed(graph, [pair])
+    while background.get() is None:
+        time.sleep(0.01)
+
+    assert background.get() is not table
+    assert (table.dist == dist).all()
+    assert_matches_dijkstra(background.get(), graph)
+
+
+def test_path_walk_is_bounded():
+    """Next hops that never reach the end give None (callers then search the graph)"""
+    graph = RouteGraph(random_routes(random.Random(4)))
+    table = DistanceTable(graph)
+    # A pair whose shortest path has a location in between
+    i, j = next(
+        (i, j) for i in range(len(graph.locations)) for j in range(len(graph.locations))
+        if table.next_hop[i, j] not in (-1, i, j)
+    )
+    table.next_hop[table.next_hop[i, j], j] = i
+
+    start, end = graph.locations[i], graph.locations[j]
+
+    assert table.path(start, end) is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"PASS: {name}")
@@ -0,0 +1,135 @@
+import sys
+import os
+
+import pandas as pd
+
+# Add the current directory to the path so we can import the screens package
+sys.path.insert(0, os.path.dirname(__file__))
+
+from screens import repository, places
+from screens.location_store import location_store
+from screens.render_cache import RenderCache
+
+
+def find(component, component_id):
+    if getattr(component, "id", None) == component_id:
+        return component
+    children = getattr(component, "children", None)
+    for child in children if isinstance(children, list) else [children]:
+        found = find(child, component_id) if child is not None else None
+        if found is not None:
+            return found
+    return None
+
+
+def use_locations(tmp_path, monkeypatch, count):
+    path = tmp_path / "locations.csv"
+    pd.DataFrame(
+        [(i, f"Room {i}", ["Main", "Science"][i % 2], i % 3, i % 4 == 0) for i in range(1, count + 1)],
+        columns=repository.locations.columns
+    ).to_csv(path, index=False)
+    monkeypatch.setattr(repository, "locations", repository.locations.at(str(path)))
+    monkeypatch.setattr(places, "_render_cache", RenderCache())
+    return repository.locations
+
+
+def test_store_finds_rows_by_id_and_window(tmp_path, monkeypatch):
+    table = use_locations(tmp_path, monkeypatch, 10)
+    table.delete(4)
+
+    stamp, store = location_store()
+    assert stamp == table.stamp() and len(store) == 9
+    assert store.position(5) == 3 and store.position(4) is None
+    assert store.get(10)["name"] == "Room 10"
+
+    start, rows = store.window(7, 4)
+    assert start == 5 and rows.id.tolist() == [7, 8, 9, 10]
+    assert location_store()[1] is store
+
+    table.insert({"name": "Annex", "building": "Main", "floor": 1, "accessible": True})
+    assert location_store()[1] is not store
+
+
+def test_big_tables_render_a_window(tmp_path, monkeypatch):
+    use_locations(tmp_path, monkeypatch, 50)
+    monkeypatch.setattr(places, "VIRTUAL_ROWS", 20)
+    monkeypatch.setattr(places, "WINDOW_ROWS", 10)
+
+    assert find(places.locations_layout(virtual=False), "locations-viewport").data is None
+
+    _, store = location_store()
+    rows, table_style, spacer_style = places.locations_window(store, 45)
+    assert [row.children[0].children for row in rows] == list(range(41, 51))
+    assert table_style["top"] == f"{40 * places.ROW_HEIGHT}px"
+    assert spacer_style["height"] == f"{51 * places.ROW_HEIGHT}px"
+
+    assert find(places.locations_layout(), "locations-viewport").data == {"start": 0}
+
+
+def test_filters_intersect_the_indexes(tmp_path, monkeypatch):
+    table = use_locations(tmp_path, monkeypatch, 40)
+    table.update(12, {"name": "Lecture Hall"})
+    _, store = location_store()
+    df = store.df
+
+    def expected(building=None, floor=None, accessible=None, name=None):
+        mask = pd.Series(True, index=df.index)
+        if building is not None:
+            mask &= df.building == building
+        if floor is not None:
+            mask &= df.floor == floor
+        if accessible is not None:
+            mask &= df.accessible == accessible
+        if name:
+            mask &= df.name.str.lower().str.contains(name.lower(), regex=False)
+        return df.id[mask].tolist()
+
+    for query in [{"building": "Main"}, {"floor": 2, "accessible": True}, {"name": "m 1"},
+                  {"name": "HALL"}, {"building": "Science", "floor": 1, "name": "oom 3"},
+                  {"accessible": False, "floor": 0}, {"building": "Annex"}]:
+        assert df.id.iloc[store.select(**query)].tolist() == expected(**query), query
+
+    assert store.select() is None
+    view = store.select(name="room 3", sort="name")
+    assert df.name.iloc[view].tolist() == ["Room 3", "Room 30", "Room 31", "Room 32", "Room 33", "Room 34",
+                                           "Room 35", "Room 36", "Room 37", "Room 38", "Room 39"]
+    assert store.select(sort="name", name="room 3") is view
+
+    assert places.location_query(floor=0, accessible=False, name="  ") == {"floor": 0, "accessible": False}
+
+
+def location_callback(name):
+    import dash
+
+    app = dash.Dash(__name__)
+    places.register_locations_callbacks(app)
+    return next(v["callback"] for v in app.callback_map.values() if v["callback"].__name__ == name).__wrapped__
+
+
+def test_saving_patches_the_plain_table(tmp_path, monkeypatch):
+    table = use_locations(tmp_path, monkeypatch, 3)
+    save_location = location_callback("save_location")
+
+    stamp, _ = location_store()
+    patch, stamp, _ = save_location(1, "Annex", "Main", "2", True, None, stamp, None, None)
+    [added] = patch.to_plotly_json()["operations"]
+    assert added["operation"] == "Append" and added["location"] == ["props", "children"]
+    assert find(added["params"]["value"], {"type": "edit-loc", "index": 4}) is not None
+
+    patch, stamp, floor_class = save_location(1, "Room 2", "Science", "5", False, 2, stamp, None, None)
+    [updated] = patch.to_plotly_json()["operations"]
+    assert updated["location"] == ["props", "children", 2]
+    assert find(updated["params"]["value"], {"type": "delete-loc", "index": 2}) is not None
+    assert stamp == table.stamp() and table.get(2)["floor"] == 5
+    assert floor_class == "form-control"
+
+
+def test_saving_rejects_a_floor_that_is_not_a_number(tmp_path, monkeypatch):
+    table = use_locations(tmp_path, monkeypatch, 3)
+    save_location = location_callback("save_location")
+    stamp = table.stamp()
+
+    for floor in ("G", "1.5"):
+        *_, floor_class = save_location(1, "Room 2", "Science", floor, False, 2, stamp, None, None)
+        assert floor_class == "form-control is-invalid"
+    assert table.get(2)["floor"] == 2 and table.stamp() == stamp
@@ -0,0 +1,47 @@
+import sys
+import os
+
+import pandas as pd
+
+# Add the current directory to the path so we can import the screens package
+sys.path.insert(0, os.path.dirname(__file__))
+
+from screens import alerts, repository
+from screens.render_cache import RenderCache
+
+
+def test_renders_are_reused_until_the_version_moves():
+    cache = RenderCache(size=2)
+    renders = []
+
+    def render(name):
+        return lambda: renders.append(name) or name
+
+    assert cache.get(1, "a", render("a")) == "a"
+    assert cache.get(1, "a", render("a again")) == "a"
+    cache.get(1, "b", render("b"))
+    cache.get(1, "a", render("a again"))
+    cache.get(1, "c", render("c"))  # evicts b, the least recently used
+    cache.get(1, "b", render("b again"))
+    cache.get(2, "a", render("a v2"))
+
+    assert renders == ["a", "b", "c", "b again", "a v2"]
+    assert (cache.hits, cache.misses) == (2, 5) and list(cache.entries) == ["a"]
+
+
+def test_saving_a_notification_invalidates_its_table(tmp_path, monkeypatch):
+    path = tmp_path / "notification.csv"
+    pd.DataFrame([(1, 1, "Lift out of order", False)], columns=repository.notifications.columns).to_csv(path, index=False)
+    monkeypatch.setattr(repository, "notifications", repository.notifications.at(str(path)))
+    monkeypatch.setattr(alerts, "_render_cache", RenderCache())
+
+    def table(text=""):
+        _, version, df = repository.notifications.stamped()
+        return alerts.notifications_table(df, version, text, "admin")
+
+    first = table()
+    assert table() is first and table("lift") is not first
+
+    repository.notifications.insert({"user_id": 2, "message": "Library closed", "delivered": True})
+    assert table() is not first
+    assert len(table().children) == 3 and len(table("library").children) == 2
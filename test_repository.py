@@ -0,0 +1,470 @@
+import json
+import sys
+import os
+
+import pandas as pd
+import pytest
+
+# Add the current directory to the path so we can import the screens package
+sys.path.insert(0, os.path.dirname(__file__))
+
+from screens import repository
+
+
+def routes_table(tmp_path):
+    path = tmp_path / "routes.csv"
+    pd.DataFrame([
+        (1, "Gym", "Library", 310, "False"),
+        (2, "Library", "Cafeteria", 291, "True"),
+    ], columns=repository.routes.columns).to_csv(path, index=False)
+    return repository.routes.at(str(path))
+
+
+def test_frame_is_typed_and_cached(tmp_path):
+    table = routes_table(tmp_path)
+    df = table.frame()
+
+    assert df.accessible.tolist() == [False, True]
+    assert table.frame() is df
+    assert table.version == 1
+
+
+def test_writes_go_through_to_the_file(tmp_path):
+    table = routes_table(tmp_path)
+
+    row = table.insert({"start_location": "Gym", "end_location": "Cafeteria", "distance_m": "40", "accessible": True})
+    assert row["id"] == 3 and row["distance_m"] == 40
+    table.update(1, {"distance_m": 57, "accessible": "true"})
+    table.delete(2)
+
+    assert table.version == 4
+    assert table.get(2) is None
+    assert table.get(1)["distance_m"] == 57
+
+    reread = table.at(table.path).frame()
+    assert reread.id.tolist() == [1, 3]
+    assert reread.accessible.tolist() == [True, True]
+
+
+def test_writes_keep_other_workers_rows(tmp_path):
+    table = routes_table(tmp_path)
+    other = table.at(table.path)  # another worker process over the same file
+    table.frame(), other.frame()
+
+    first = table.insert({"start_location": "Gym", "end_location": "Pool", "distance_m": 5, "accessible": True})
+    second = other.insert({"start_location": "Pool", "end_location": "Gym", "distance_m": 5, "accessible": True})
+    table.update(1, {"distance_m": 57})
+
+    # Each write reloads what the other wrote since, well within CHECK_INTERVAL
+    reread = table.at(table.path).frame()
+    assert reread.id.tolist() == [1, 2, first["id"], second["id"]]
+    assert reread.distance_m.tolist()[0] == 57
+
+
+def test_external_edits_are_picked_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(repository, "CHECK_INTERVAL", 0.0)
+    table = routes_table(tmp_path)
+    table.frame()
+
+    with open(table.path, "a", encoding="utf-8") as f:
+        f.write("3,Gym,Annex,12,True\n")
+
+    assert table.frame().id.tolist() == [1, 2, 3]
+    assert table.version == 2
+
+
+def test_missing_file_uses_defaults(tmp_path):
+    users = repository.users.at(str(tmp_path / "users.csv"))
+
+    assert users.find("username", "admin")["role"] == "admin"
+    assert os.path.exists(users.path)
+
+
+
+def test_sqlite_backend_migrates_and_writes_rows(tmp_path):
+    table = routes_table(tmp_path)
+    database = str(tmp_path / "campus.db")
+    table.use_backend(repository.SqliteBackend(database, table))
+
+    assert table.frame().accessible.tolist() == [False, True]
+    assert table.get(2)["end_location"] == "Cafeteria"
+
+    table.insert({"start_location": "Gym", "end_location": "Cafeteria", "distance_m": 40, "accessible": True})
+    table.update(1, {"distance_m": 57})
+    table.delete(2)
+    assert table.frame().id.tolist() == [1, 3]
+
+    # A fresh connection sees the same rows and does not migrate the CSV again
+    reopened = table.at(table.csv_path)
+    reopened.use_backend(repository.SqliteBackend(database, reopened))
+    df = reopened.frame()
+    assert df.id.tolist() == [1, 3]
+    assert df.distance_m.tolist() == [57, 40]
+    assert df.accessible.tolist() == [False, True]
+    assert reopened.find("start_location", "Nowhere") is None
+
+    indexes = {name for (name,) in reopened.backend.conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"
+    )}
+    assert "routes_start_location_end_location" in indexes
+
+
+def test_sqlite_backend_picks_up_other_connections(tmp_path, monkeypatch):
+    monkeypatch.setattr(repository, "CHECK_INTERVAL", 0.0)
+    table = routes_table(tmp_path)
+    database = str(tmp_path / "campus.db")
+    table.use_backend(repository.SqliteBackend(database, table))
+    table.frame()
+
+    other = table.at(table.csv_path)
+    other.use_backend(repository.SqliteBackend(database, other))
+    other.delete(1)
+
+    assert table.frame().id.tolist() == [2]
+
+
+def test_sqlite_users_default_admin(tmp_path):
+    users = repository.users.at(str(tmp_path / "users.csv"))
+    users.use_backend(repository.SqliteBackend(str(tmp_path / "campus.db"), users))
+
+    admin = users.find("username", "admin")
+    assert admin["password"] == "1234"
+    assert not os.path.exists(users.csv_path)
+
+
+def notifications_table(tmp_path):
+    path = tmp_path / "notification.csv"
+    path.write_text("id,user_id,message,delivered\n1,1,Welcome,False\n2,2,Room change,True")
+    return repository.notifications.at(str(path))
+
+
+def test_append_only_writes(tmp_path):
+    table = notifications_table(tmp_path)
+
+    table.insert({"user_id": 3, "message": "Route added", "delivered": False})
+    table.update(1, {"delivered": True})
+    table.delete(2)
+
+    with open(table.path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 6
+    assert lines[3:] == ["3,3,Route added,False", "1,1,Welcome,True", "2,,,"]
+
+    df = table.at(table.path).frame()
+    assert df.id.tolist() == [1, 3]
+    assert df.user_id.tolist() == [1, 3]
+    assert df.delivered.tolist() == [True, False]
+    assert table.insert({"user_id": 1, "message": "Again", "delivered": False})["id"] == 4
+
+
+def test_append_only_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(repository, "COMPACT_AFTER", 5)
+    table = notifications_table(tmp_path)
+
+    for _ in range(3):
+        table.update(1, {"message": "Edited"})
+    table.delete(2)
+
+    with open(table.path, encoding="utf-8") as f:
+        assert f.read().splitlines() == ["id,user_id,message,delivered", "1,1,Edited,False"]
+    assert table.at(table.path).frame().message.tolist() == ["Edited"]
+
+
+def test_append_only_compaction_keeps_other_workers_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(repository, "COMPACT_AFTER", 3)
+    table = notifications_table(tmp_path)
+    table.update(1, {"message": "Edited"})
+    table.update(1, {"message": "Edited again"})
+
+    # A worker starting from the snapshot gets the count of superseded lines with it
+    table.at(table.path).frame()
+    other = table.at(table.path)
+    other.frame()
+    assert other.backend.stale == 2
+
+    # The compaction triggered with a frame that misses the other worker's row keeps it
+    table.frame()
+    other.insert({"user_id": 3, "message": "Route added", "delivered": False})
+    table.backend.update(table.frame(), 2, {"delivered": False})
+
+    with open(table.path, encoding="utf-8") as f:
+        assert f.read().splitlines() == [
+            "id,user_id,message,delivered", "1,1,Edited again,False", "2,2,Room change,True", "3,3,Route added,False",
+        ]
+
+
+def journaled(table, tmp_path):
+    table.use_backend(repository.JournaledBackend(repository.CsvBackend(table.path), str(tmp_path / "routes.journal")))
+    return table
+
+
+def test_journal_replays_on_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(repository, "CHECKPOINT_AFTER", 10**6)
+    monkeypatch.setattr(repository, "CHECKPOINT_INTERVAL", 10**6)
+    table = journaled(routes_table(tmp_path), tmp_path)
+
+    table.insert({"start_location": "Gym", "end_location": "Cafeteria", "distance_m": 40, "accessible": True})
+    table.update(1, {"distance_m": 57})
+    table.delete(2)
+
+    # Writes are durable in the journal; the CSV file is untouched until a checkpoint
+    assert len(repository.read_journal(str(tmp_path / "routes.journal"))) == 3
+    assert table.at(table.path).frame().id.tolist() == [1, 2]
+
+    reopened = journaled(table.at(table.path), tmp_path)
+    df = reopened.frame()
+    assert df.id.tolist() == [1, 3]
+    assert df.distance_m.tolist() == [57, 40]
+    assert df.accessible.tolist() == [False, True]
+
+    # Loading a journal of CHECKPOINT_AFTER records or more (e.g. left by a
+    # worker that exited) folds it into the CSV file
+    assert len(repository.read_journal(str(tmp_path / "routes.journal"))) == 3
+    monkeypatch.setattr(repository, "CHECKPOINT_AFTER", 3)
+    assert journaled(table.at(table.path), tmp_path).frame().id.tolist() == [1, 3]
+    assert repository.read_journal(str(tmp_path / "routes.journal")) == []
+    assert table.at(table.path).frame().id.tolist() == [1, 3]
+
+
+def test_journal_checkpoints_keep_other_workers_records(tmp_path, monkeypatch):
+    import threading
+
+    monkeypatch.setattr(repository, "CHECKPOINT_AFTER", 1)
+    table = journaled(routes_table(tmp_path), tmp_path)
+    other = journaled(table.at(table.path), tmp_path)  # another worker over the same files
+    table.frame(), other.frame()
+
+    first = table.insert({"start_location": "Gym", "end_location": "Pool", "distance_m": 5, "accessible": True})
+    second = other.insert({"start_location": "Pool", "end_location": "Gym", "distance_m": 5, "accessible": True})
+
+    for _ in range(200):
+        if repository.read_journal(str(tmp_path / "routes.journal")) == []:
+            break
+        threading.Event().wait(0.01)
+    assert table.at(table.path).frame().id.tolist() == [1, 2, first["id"], second["id"]]
+
+
+def test_journal_appends_are_seen_by_other_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(repository, "CHECKPOINT_AFTER", 10**6)
+    monkeypatch.setattr(repository, "CHECKPOINT_INTERVAL", 10**6)
+    monkeypatch.setattr(repository, "CHECK_INTERVAL", 0.0)
+    table = journaled(routes_table(tmp_path), tmp_path)
+    other = journaled(table.at(table.path), tmp_path)
+    other.frame()
+    table.frame()
+    version = table.version
+
+    table.update(1, {"distance_m": 9999})
+
+    # The CSV file is unchanged, but the journal grew
+    assert other.get(1)["distance_m"] == 9999
+    # ...while the writer's own append does not make it reload
+    table.frame()
+    assert table.version == version + 1
+
+
+def test_journal_replay_is_idempotent(tmp_path):
+    df = routes_table(tmp_path).frame()
+    records = [
+        {"op": "insert", "row": {"id": 3, "start_location": "Gym", "end_location": "Annex", "distance_m": 9, "accessible": True}},
+        {"op": "update", "id": 3, "values": {"distance_m": 12}},
+        {"op": "delete", "id": 1},
+    ]
+    once = repository.replay(df, records, df.columns.tolist())
+
+    assert once.id.tolist() == [2, 3]
+    assert once.equals(repository.replay(once, records, df.columns.tolist()))
+
+
+def test_journal_group_commit_and_checkpoint(tmp_path, monkeypatch):
+    import threading
+
+    monkeypatch.setattr(repository, "CHECKPOINT_AFTER", 40)
+    monkeypatch.setattr(repository, "GROUP_COMMIT_WINDOW", 0.05)
+    fsyncs = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (fsyncs.append(fd), fsync(fd)))
+    table = journaled(routes_table(tmp_path), tmp_path)
+    table.frame()
+
+    def add(i):
+        table.insert({"start_location": f"A{i}", "end_location": "B", "distance_m": i, "accessible": False})
+
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 40 concurrent writes share far fewer fsyncs
+    assert len(fsyncs) < 20
+    version = table.version
+
+    # ...and the 40th record triggers a checkpoint into the CSV file
+    for _ in range(200):
+        if repository.read_journal(str(tmp_path / "routes.journal")) == []:
+            break
+        threading.Event().wait(0.01)
+    assert len(table.at(table.path).frame()) == 42
+
+    # The checkpoint's own rewrite of the CSV file is not mistaken for an outside edit
+    monkeypatch.setattr(repository, "CHECK_INTERVAL", 0.0)
+    table.frame()
+    assert table.version == version
+
+
+def test_snapshot_used_until_csv_changes(tmp_path, monkeypatch):
+    table = routes_table(tmp_path)
+    table.frame()
+    snapshot = repository.snapshot_path(table.path)
+    assert os.path.exists(snapshot)
+
+    # A fresh load reads the typed snapshot without parsing the CSV
+    fresh = table.at(table.path)
+    monkeypatch.setattr(repository.CsvBackend, "parse", lambda self, t: 1 / 0)
+    df = fresh.frame()
+    assert df.accessible.tolist() == [False, True]
+    monkeypatch.undo()
+
+    # An outside edit to the CSV makes the snapshot stale
+    with open(table.path, "a", encoding="utf-8") as f:
+        f.write("3,Gym,Annex,12,True\n")
+    assert table.at(table.path).frame().id.tolist() == [1, 2, 3]
+
+    # Saves refresh the snapshot
+    table.at(table.path).insert({"start_location": "Gym", "end_location": "Pool", "distance_m": 3, "accessible": True})
+    key, df, _ = repository.read_snapshot(snapshot)
+    assert key == repository.file_key(table.path)
+    assert df.id.tolist() == [1, 2, 3, 4]
+
+    # ...each through a temporary file of its own, which is gone afterwards
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+    assert repository.temp_path(snapshot) != repository.temp_path(snapshot)
+
+
+def test_schema_dtypes(tmp_path):
+    table = routes_table(tmp_path)
+    with open(table.path, "a", encoding="utf-8") as f:
+        f.write("3,Gym,Annex,12.5,\n")
+    df = table.frame()
+
+    assert {column: str(dtype) for column, dtype in df.dtypes.items()} == {
+        "id": "Int32", "start_location": "category", "end_location": "category",
+        "distance_m": "Float64", "accessible": "boolean",
+    }
+    assert df.accessible.isna().tolist() == [False, False, True]
+    assert df.distance_m.tolist() == [310, 291, 12.5]
+
+
+def test_new_category_values_on_insert_and_update(tmp_path):
+    table = routes_table(tmp_path)
+
+    table.insert({"start_location": "Pool", "end_location": "Gym", "distance_m": 40, "accessible": True})
+    table.update(1, {"end_location": "Sports Hall"})
+    df = table.frame()
+
+    assert str(df.start_location.dtype) == "category" and str(df.end_location.dtype) == "category"
+    assert df.start_location.tolist() == ["Gym", "Library", "Pool"]
+    assert df.end_location.tolist() == ["Sports Hall", "Cafeteria", "Gym"]
+    assert str(df.id.dtype) == "Int32"
+
+
+def test_typed_parses_bad_values_as_missing(tmp_path):
+    path = tmp_path / "locations.csv"
+    path.write_text("id,name,building,floor,accessible\n1,Lab,Main,G,yes\n2,Office,Main,2,nope\n")
+    df = repository.locations.at(str(path)).frame()
+
+    assert df.floor.isna().tolist() == [True, False]
+    assert df.accessible.tolist()[0] is True and df.accessible.isna().tolist() == [False, True]
+    assert str(df.building.dtype) == "category"
+
+
+def test_memory_report(tmp_path):
+    report = routes_table(tmp_path).memory_report()
+
+    assert report["rows"] == 2
+    assert report["columns"]["start_location"]["dtype"] == "category"
+    assert report["bytes"] == sum(c["bytes"] for c in report["columns"].values())
+
+
+def test_sequence_hands_out_blocks_per_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(repository, "SEQUENCE_BLOCK", 10)
+    table = routes_table(tmp_path)
+    other = table.at(table.path)  # another worker process over the same files
+
+    first = table.insert({"start_location": "Gym", "end_location": "Pool", "distance_m": 5, "accessible": True})
+    second = other.insert({"start_location": "Pool", "end_location": "Gym", "distance_m": 5, "accessible": True})
+    third = table.insert({"start_location": "Gym", "end_location": "Hall", "distance_m": 9, "accessible": False})
+
+    # The third insert reloads the table first, and ids stay above the largest one in it
+    assert (first["id"], second["id"], third["id"]) == (3, 13, 23)
+    assert table.at(table.path).frame().id.tolist() == [1, 2, 3, 13, 23]
+    with open(tmp_path / "sequences.json", encoding="utf-8") as f:
+        assert json.load(f) == {"routes": 33}
+
+
+def test_sequence_skips_ids_already_in_the_table(tmp_path):
+    table = routes_table(tmp_path)
+    table.insert({"id": 40, "start_location": "Gym", "end_location": "Pool", "distance_m": 5, "accessible": True})
+    table.delete(40)
+
+    assert table.insert({"start_location": "Gym", "end_location": "Pool", "distance_m": 5, "accessible": True})["id"] == 41
+
+
+def test_stamp_changes_with_every_write_from_any_process(tmp_path):
+    table = journaled(routes_table(tmp_path), tmp_path)
+    other = journaled(table.at(table.path), tmp_path)  # another worker over the same files
+    stamp = table.stamp()
+
+    assert other.stamp() == stamp
+    table.update(1, {"distance_m": 12})
+    assert table.stamp() != stamp and other.stamp() == table.stamp()
+    assert set(repository.data_versions()) == {"routes", "locations", "notifications", "users"}
+
+
+def test_stamped_frame_is_as_new_as_its_stamp(tmp_path, monkeypatch):
+    monkeypatch.setattr(repository, "CHECKPOINT_AFTER", 10**6)
+    monkeypatch.setattr(repository, "CHECKPOINT_INTERVAL", 10**6)
+    table = journaled(routes_table(tmp_path), tmp_path)
+    other = journaled(table.at(table.path), tmp_path)  # another worker over the same files
+    table.frame()
+    other.stamped()
+
+    # Only the journal changes, well within CHECK_INTERVAL
+    table.update(1, {"distance_m": 9999})
+    stamp, _, df = other.stamped()
+    assert stamp == table.stamp()
+    assert df.distance_m.tolist()[0] == 9999
+
+
+def test_stamp_is_kept_by_checkpoints(tmp_path, monkeypatch):
+    monkeypatch.setattr(repository, "CHECKPOINT_AFTER", 10**6)
+    monkeypatch.setattr(repository, "CHECKPOINT_INTERVAL", 10**6)
+    table = journaled(routes_table(tmp_path), tmp_path)
+    table.replace(table.frame())  # starts the journal with its base line
+    table.update(1, {"distance_m": 12})
+    table.update(2, {"distance_m": 13})
+    stamp = table.stamp()
+
+    # Another worker loading the journal folds it into the CSV file
+    monkeypatch.setattr(repository, "CHECKPOINT_AFTER", 2)
+    other = journaled(table.at(table.path), tmp_path)
+    assert other.frame().distance_m.tolist() == [12, 13]
+    assert repository.read_journal(str(tmp_path / "routes.journal")) == []
+
+    # The data did not change, so neither did the stamp (nor anything stamped with it)
+    assert table.stamp() == other.stamp() == stamp
+    other.update(1, {"distance_m": 14})
+    assert table.stamp() != stamp
+
+
+def test_coerce_rejects_values_that_do_not_fit(tmp_path):
+    table = routes_table(tmp_path)
+
+    assert table.coerce("id", "7") == 7 and table.coerce("accessible", "yes") is True
+    for column, value in (("distance_m", "far"), ("id", "2.5"), ("id", 2**40), ("accessible", "maybe")):
+        with pytest.raises(ValueError):
+            table.coerce(column, value)
+    with pytest.raises(ValueError):
+        table.update(1, {"distance_m": "far"})
+    assert table.get(1)["distance_m"] == 310
@@ -0,0 +1,223 @@
+import sys
+import os
+import random
+
+import pandas as pd
+
+# Add the current directory to the path so we can import the screens package
+sys.path.insert(0, os.path.dirname(__file__))
+
+from screens.route_graph import RouteGraph
+
+
+def make_routes(rows):
+    return pd.DataFrame(rows, columns=["id", "start_location", "end_location", "distance_m", "accessible"])
+
+
+def sample_graph():
+    return RouteGraph(make_routes([
+        (1, "Gym", "Library", 310, False),
+        (2, "Gym", "Library", 57, False),
+        (3, "Library", "Cafeteria", 291, True),
+        (4, "Cafeteria", "Lecture Hall A", 59, True),
+        (5, "Gym", "Cafeteria", 481, True),
+        (6, "Annex", "Car Park", 20, True),
+    ]))
+
+
+def test_direct_route_uses_shortest_parallel_edge():
+    """Parallel routes collapse to the cheapest one"""
+    route = sample_graph().shortest_path("Gym", "Library")
+
+    assert route["path"] == ["Gym", "Library"]
+    assert route["distance_m"] == 57
+    assert route["legs"][0]["route_id"] == 2
+
+
+def test_multi_hop_route():
+    """Locations without a direct route are reached through intermediate stops"""
+    route = sample_graph().shortest_path("Gym", "Lecture Hall A")
+
+    assert route["path"] == ["Gym", "Library", "Cafeteria", "Lecture Hall A"]
+    assert route["distance_m"] == 57 + 291 + 59
+    assert [leg["distance_m"] for leg in route["legs"]] == [57, 291, 59]
+    assert route["accessible"] is False
+
+
+def test_routes_are_bidirectional():
+    """Routes can be walked in the reverse direction"""
+    route = sample_graph().shortest_path("Lecture Hall A", "Gym")
+
+    assert route["path"] == ["Lecture Hall A", "Cafeteria", "Library", "Gym"]
+
+
+def test_unreachable_and_unknown_locations():
+    """Disconnected or unknown locations have no route"""
+    graph = sample_graph()
+
+    assert graph.shortest_path("Gym", "Annex") is None
+    assert graph.shortest_path("Gym", "Nowhere") is None
+
+
+def test_accessible_only_routing():
+    """Accessible mode only walks accessible routes, even when they are longer"""
+    graph = sample_graph()
+
+    route = graph.shortest_path("Gym", "Lecture Hall A", accessible_only=True)
+    assert route["path"] == ["Gym", "Cafeteria", "Lecture Hall A"]
+    assert route["distance_m"] == 481 + 59
+    assert route["accessible"] is True
+
+    assert graph.shortest_path("Gym", "Library", accessible_only=True)["path"] == ["Gym", "Cafeteria", "Library"]
+    assert graph.best_edge("Gym", "Library", accessible_only=True) is None
+
+
+def all_simple_paths(graph, start, end, accessible_only=False):
+    paths = []
+
+    def walk(node, visited, total):
+        if node == end:
+            paths.append(total)
+            return
+        for neighbour, weight, accessible, route_id in graph.edges_from(node, accessible_only):
+            if neighbour not in visited:
+                walk(neighbour, visited | {neighbour}, total + weight)
+
+    walk(start, {start}, 0.0)
+    return sorted(paths)
+
+
+def test_k_shortest_paths_include_parallel_routes():
+    """Parallel Gym-Library routes show up as separate alternatives"""
+    paths, complete = sample_graph().k_shortest_paths("Gym", "Library", 3)
+
+    assert complete
+    assert [p["distance_m"] for p in paths] == [57, 310, 481 + 291]
+    assert [p["legs"][0]["route_id"] for p in paths] == [2, 1, 5]
+
+
+def test_k_shortest_paths_match_enumeration():
+    """Yen's algorithm returns the K cheapest loopless paths"""
+    rng = random.Random(3)
+    names = [f"L{i}" for i in range(7)]
+    rows = []
+    for route_id in range(1, 16):
+        start, end = rng.sample(names, 2)
+        rows.append((route_id, start, end, rng.randint(1, 20), rng.random() < 0.6))
+    graph = RouteGraph(make_routes(rows))
+
+    for accessible_only in (False, True):
+        expected = all_simple_paths(graph, "L0", "L1", accessible_only)[:5]
+        paths, complete = graph.k_shortest_paths("L0", "L1", 5, accessible_only)
+        assert complete
+        assert [p["distance_m"] for p in paths] == expected
+        assert all(len(set(p["path"])) == len(p["path"]) for p in paths)
+
+
+def test_k_shortest_paths_time_budget():
+    """An exhausted time budget returns the paths found so far"""
+    paths, complete = sample_graph().k_shortest_paths("Gym", "Library", 3, time_budget=0)
+
+    assert not complete
+    assert [p["distance_m"] for p in paths] == [57]
+
+
+def campus_graph(rng, buildings=4, floors=5, rooms=6, unknown=0):
+    """Rooms on floors in buildings; stairs cost per floor and crossings cost extra"""
+    names, meta = [], []
+    for b in range(buildings):
+        for f in range(floors):
+            for r in range(rooms):
+                names.append(f"B{b}-F{f}-R{r}")
+                meta.append((names[-1], f"Building {b}", f))
+
+    rows = []
+    for i, (name, building, floor) in enumerate(meta):
+        for other, other_building, other_floor in rng.sample(meta, 3):
+            if other_building == building and abs(other_floor - floor) > 1:
+                continue
+            distance = rng.randint(5, 30) + 40 * abs(other_floor - floor)
+            if other_building != building:
+                distance += 300
+            rows.append((len(rows) + 1, name, other, distance, rng.random() < 0.7))
+
+    locations = pd.DataFrame(meta[unknown:], columns=["name", "building", "floor"])
+    graph = RouteGraph(make_routes(rows))
+    graph.attach_locations(locations)
+    return graph
+
+
+def test_astar_matches_dijkstra_and_explores_less():
+    """A* finds equally short routes while settling fewer locations"""
+    rng = random.Random(4)
+    for unknown in (0, 10):
+        graph = campus_graph(rng, unknown=unknown)
+        dijkstra_explored = astar_explored = 0
+        for _ in range(60):
+            start, end = rng.sample(graph.locations, 2)
+            for accessible_only in (False, True):
+                expected = graph.shortest_path(start, end, accessible_only)
+                actual = graph.shortest_path(start, end, accessible_only, astar=True)
+                assert (actual and actual["distance_m"]) == (expected and expected["distance_m"])
+            dijkstra_explored += graph.explored(start, end)
+            astar_explored += graph.explored(start, end, astar=True)
+        assert astar_explored < dijkstra_explored
+
+
+def test_astar_without_metadata_is_dijkstra():
+    graph = sample_graph()
+    graph.attach_locations(pd.DataFrame(columns=["name", "building", "floor"]))
+
+    assert graph.shortest_path("Gym", "Lecture Hall A", astar=True) == graph.shortest_path("Gym", "Lecture Hall A")
+
+
+def test_binary_blob_round_trip():
+    """The compact graph saves to one blob and loads back unchanged"""
+    graph = sample_graph()
+    loaded = RouteGraph.from_bytes(graph.to_bytes())
+
+    assert loaded.locations == graph.locations
+    for name in ["offsets", "targets", "distances", "route_ids", "accessible_bits"]:
+        assert (getattr(loaded, name) == getattr(graph, name)).all()
+    for accessible_only in (False, True):
+        for start in graph.locations:
+            for end in graph.locations:
+                assert loaded.shortest_path(start, end, accessible_only) == graph.shortest_path(start, end, accessible_only)
+
+    empty = RouteGraph.from_bytes(RouteGraph(make_routes([])).to_bytes())
+    assert empty.locations == [] and empty.shortest_path("Gym", "Library") is None
+
+
+def test_saved_graph_is_memory_mapped(tmp_path):
+    """save() replaces the file whole; load() maps it read-only with the A* metadata and stamp"""
+    graph = campus_graph(random.Random(5))
+    path = str(tmp_path / "routes.graph")
+    graph.save(path, stamp=[[1, 2], None])
+    loaded = RouteGraph.load(path)
+
+    assert loaded.stamp == [[1, 2], None]
+    assert not loaded.targets.flags.writeable and not loaded.accessible_slots.flags.writeable
+    for name in ["buildings", "floors", "building_cost", "floor_cost", "coord_scale"]:
+        assert loaded.location_meta[name] == graph.location_meta[name]
+    assert (loaded.accessible_offsets == graph.accessible_offsets).all()
+    assert os.listdir(tmp_path) == ["routes.graph"]
+
+    rng = random.Random(6)
+    for _ in range(20):
+        start, end = rng.sample(graph.locations, 2)
+        assert loaded.shortest_path(start, end, astar=True) == graph.shortest_path(start, end, astar=True)
+        assert loaded.explored(start, end, astar=True) == graph.explored(start, end, astar=True)
+
+
+def test_same_start_and_end():
+    route = sample_graph().shortest_path("Gym", "Gym")
+
+    assert route["path"] == ["Gym"]
+    assert route["distance_m"] == 0
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"PASS: {name}")
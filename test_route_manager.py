@@ -0,0 +1,51 @@
+import sys
+import os
+
+import pandas as pd
+
+# Add the current directory to the path so we can import the screens package
+sys.path.insert(0, os.path.dirname(__file__))
+
+from screens import repository, route_manager
+from screens.render_cache import RenderCache
+
+
+def use_routes(tmp_path, monkeypatch, rows):
+    path = tmp_path / "routes.csv"
+    pd.DataFrame(rows, columns=repository.routes.columns).to_csv(path, index=False)
+    monkeypatch.setattr(repository, "routes", repository.routes.at(str(path)))
+    monkeypatch.setattr(route_manager, "PAGE_SIZE", 2)
+    monkeypatch.setattr(route_manager, "_render_cache", RenderCache())
+    return repository.routes
+
+
+def test_pages_are_sliced_from_a_cached_sort(tmp_path, monkeypatch):
+    use_routes(tmp_path, monkeypatch, [
+        (1, "Gym", "Library", 310, True),
+        (2, "Annex", "Cafeteria", 291, False),
+        (3, "Library", "Annex", 57, True),
+        (4, "Cafeteria", "Gym", 120, True),
+        (5, "Zoo", "Gym", 75, False),
+    ])
+    by_start = [{"column_id": "start_location", "direction": "asc"}]
+
+    rows, page_count, page, stamp = route_manager.routes_page(1, by_start)
+    assert (page_count, page, stamp) == (3, 1, repository.routes.stamp())
+    assert [r["start_location"] for r in rows] == ["Gym", "Library"]
+    assert rows[0] == {"id": 1, "start_location": "Gym", "end_location": "Library", "distance_m": 310.0,
+                       "accessible": "Yes", "edit": "Edit", "delete": "Delete"}
+
+    order = route_manager.sort_order(repository.routes.version, repository.routes.frame(), by_start)
+    assert route_manager.sort_order(repository.routes.version, repository.routes.frame(), by_start) is order
+
+    rows = route_manager.routes_page(0, [{"column_id": "distance_m", "direction": "desc"}])[0]
+    assert [r["id"] for r in rows] == [1, 2]
+
+
+def test_page_is_clamped_after_deletes(tmp_path, monkeypatch):
+    table = use_routes(tmp_path, monkeypatch, [(i, "A", "B", i, True) for i in range(1, 6)])
+    table.delete(5)
+
+    rows, page_count, page, _ = route_manager.routes_page(2)
+    assert (page_count, page) == (2, 1)
+    assert [r["id"] for r in rows] == [3, 4]
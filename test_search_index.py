@@ -0,0 +1,53 @@
+import sys
+import os
+
+# Add the current directory to the path so we can import the screens package
+sys.path.insert(0, os.path.dirname(__file__))
+
+from screens.search_index import NameSearchIndex
+
+
+def sample_index():
+    return NameSearchIndex(["Library", "Lecture Hall A", "Lecture Hall B", "Gym", "Cafeteria", "Main Library Annex"])
+
+
+def test_prefix_matches_come_first():
+    """Prefix matches rank ahead of substring matches, case-insensitively"""
+    index = sample_index()
+
+    assert index.search("lib") == ["Library", "Main Library Annex"]
+    assert index.search("LECT") == ["Lecture Hall A", "Lecture Hall B"]
+
+
+def test_substring_and_short_queries():
+    index = sample_index()
+
+    assert index.search("hall b") == ["Lecture Hall B"]
+    assert index.search("teria") == ["Cafeteria"]
+    assert index.search("g") == ["Gym"]
+    assert index.search("zzz") == []
+
+    assert [index.names[i] for i in index.containing_ids("ll")] == ["Lecture Hall A", "Lecture Hall B"]
+    assert [index.names[i] for i in index.containing_ids("brar")] == ["Library", "Main Library Annex"]
+
+
+def test_limit_and_empty_query():
+    index = sample_index()
+
+    assert index.search("", limit=2) == ["Cafeteria", "Gym"]
+    assert len(index.search("a", limit=1)) == 1
+
+
+def test_matches_brute_force():
+    names = [f"Room {i} Block {i % 7}" for i in range(500)]
+    index = NameSearchIndex(names)
+    for query in ["block 3", "room 12", "m 4", "k 6", "oom 49"]:
+        expected = {n for n in names if query in n.lower()}
+        assert set(index.search(query, limit=len(names))) == expected
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"PASS: {name}")